@@ -1,10 +1,14 @@
 # app/agent.py
-import os, re, json
-from typing import List, Dict
-from neo4j import GraphDatabase
+import os, re, json, time, threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, List, Dict, Optional, Tuple
 
-from app.rag_mistral import retrieve, build_prompt, answer_with_ollama
-from kg.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from app.rag_mistral import (
+    build_prompt, answer_with_ollama, stream_with_ollama, format_metrics, get_retriever,
+)
+from app.answer_cache import cache_from_env as answer_cache_from_env
+from kg.backend import get_kg_backend
+from kg.cache import KG_VERSION_NAME, cache_from_env as kg_cache_from_env
 
 # ---- Config (env overrides) ----
 QDRANT_PATH = os.getenv("QDRANT_PATH", "db.qdrant")
@@ -12,6 +16,30 @@ POLICY_COLL = os.getenv("POLICY_COLL", "kb_policy_faqs")
 PRODUCT_COLL = os.getenv("PRODUCT_COLL", "kb_product_faqs")
 OLLAMA_MODEL = os.getenv("MISTRAL_MODEL", "phi3:mini")  # same as your rag_mistral default
 
+# Per-source deadlines for the retrieval fan-out (seconds, measured from fan-out start)
+QDRANT_TIMEOUT_S = float(os.getenv("QDRANT_TIMEOUT_S", "5"))
+KG_TIMEOUT_S = float(os.getenv("KG_TIMEOUT_S", "2"))
+
+# Shared by all requests; a slow source keeps its worker busy but never blocks the caller
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_WORKERS", "8")), thread_name_prefix="retrieve"
+)
+
+# Speculative mode: start retrieval together with agent_decide instead of after it.
+# Runs _retrieve_parallel on its own pool (it blocks on _retrieval_pool futures).
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "0") == "1"
+_speculation_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SPECULATION_WORKERS", "4")), thread_name_prefix="speculate"
+)
+_spec_lock = threading.Lock()
+_spec_stats = {"launched": 0, "used": 0, "discarded": 0, "saved_s": 0.0}
+
+# Semantic answer cache (None when ANSWER_CACHE=0); re-ingesting either KB or the KG clears it
+answer_cache = answer_cache_from_env(kb_names=(POLICY_COLL, PRODUCT_COLL, KG_VERSION_NAME))
+
+# KG lookup cache (None when KG_CACHE=0); KG ingest scripts clear it
+kg_cache = kg_cache_from_env()
+
 AGENT_PROMPT = """
 You're a course teaching assistant.
 
@@ -62,102 +90,288 @@ def _safe_json_from_text(raw: str) -> Dict:
         return {"action": "SEARCH", "reasoning": "Parse failure or ambiguous output."}
 
 
-def agent_decide(question: str, context_text: str = "") -> Dict:
+def _first_json_end(buf: str, state: Dict) -> bool:
+    """
+    Incremental scan for the end of the first top-level JSON object.
+    `state` carries depth/in_str/esc across calls so tokens can be fed one at a time.
+    """
+    for ch in buf:
+        if state["depth"] == 0:
+            if ch == "{":
+                state["depth"] = 1
+            continue
+        if state["in_str"]:
+            if state["esc"]:
+                state["esc"] = False
+            elif ch == "\\":
+                state["esc"] = True
+            elif ch == '"':
+                state["in_str"] = False
+        elif ch == '"':
+            state["in_str"] = True
+        elif ch == "{":
+            state["depth"] += 1
+        elif ch == "}":
+            state["depth"] -= 1
+            if state["depth"] == 0:
+                return True
+    return False
+
+
+def agent_decide(question: str, context_text: str = "", metrics: Optional[Dict] = None) -> Dict:
     """
     Ask the model to choose SEARCH vs ANSWER using the homework template.
+    Streams the reply and stops as soon as the first JSON object is complete,
+    instead of waiting for whatever the model appends after it.
     """
     prompt = AGENT_PROMPT.format(question=question, context=context_text)
-    raw = answer_with_ollama(prompt, model=OLLAMA_MODEL)
-    return _safe_json_from_text(raw)
+    parts = []
+    state = {"depth": 0, "in_str": False, "esc": False}
+    stream = stream_with_ollama(prompt, model=OLLAMA_MODEL, metrics=metrics)
+    try:
+        for token in stream:
+            parts.append(token)
+            if _first_json_end(token, state):
+                break
+    finally:
+        stream.close()  # drops the HTTP stream -> Ollama stops generating
+    return _safe_json_from_text("".join(parts))
 
 
 def _kg_facts(query: str, limit: int = 2) -> List[Dict]:
     """
-    Very small KG fetch (uses same matching idea as kg/query.py) but returns compact text snippets.
-    """
-    drv = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    CQL = """
-    MATCH (n)
-    WHERE any(w IN split(toLower($q), " ")
-      WHERE (toLower(coalesce(n.question,"")) CONTAINS w OR toLower(coalesce(n.answer,"")) CONTAINS w))
-    RETURN labels(n) AS labels, n.question AS q, n.answer AS a
-    LIMIT $lim
+    Very small KG fetch: keyword search on the configured KG backend (KG_BACKEND, see
+    kg/backend.py), best score first, returned as compact text snippets.
+    Repeated term sets are served from kg_cache.
     """
+    backend = get_kg_backend()
+    rows = (kg_cache.search(query, limit, backend.search) if kg_cache is not None
+            else backend.search(query, limit=limit))
     out = []
-    with drv.session() as s:
-        for r in s.run(CQL, q=query, lim=limit):
-            q = (r["q"] or "").strip()
-            a = (r["a"] or "").strip()
-            if not (q or a):
-                continue
-            text = (q + " — " + a).strip(" —")
-            out.append({"title": "KG", "url": None, "text": text, "score": 1.0})
+    for r in rows:
+        q = (r["question"] or "").strip()
+        a = (r["answer"] or "").strip()
+        if not (q or a):
+            continue
+        text = (q + " — " + a).strip(" —")
+        out.append({"title": "KG", "url": None, "text": text, "score": r["score"]})
     return out
 
 
-def _retrieve_parallel(user_q: str, k_policy=2, k_product=1) -> List[Dict]:
+def _retrieve_parallel(user_q: str, k_policy=2, k_product=1, k_kg=2) -> Tuple[List[Dict], bool]:
     """
-    Parallel retrieval using your existing retriever; collects policy, product, and KG facts.
+    Fan out to policy KB, product KB and KG at the same time, each with its own deadline.
+    Sources that fail or miss their deadline are dropped, so the caller gets partial
+    context in ~max(source latency) instead of the sum. Returns (context, degraded);
+    degraded is True when any source was dropped.
     """
+    retriever = get_retriever()
+    start = time.monotonic()
+
+    # Embed once; both Qdrant searches wait on the same vector
+    vec_future = _retrieval_pool.submit(retriever.embed, user_q)
+
+    def qdrant_source(collection: str, domain: str, k: int):
+        return lambda: retriever.retrieve(
+            user_q, k=k, collection=collection, filters={"domain": domain},
+            vector=vec_future.result(),
+        )
+
+    sources = [
+        ("policy", QDRANT_TIMEOUT_S, qdrant_source(POLICY_COLL, "policy", k_policy)),
+        ("product", QDRANT_TIMEOUT_S, qdrant_source(PRODUCT_COLL, "product", k_product)),
+        ("kg", KG_TIMEOUT_S, lambda: _kg_facts(user_q, limit=k_kg)),
+    ]
+    futures = [(start + timeout, _retrieval_pool.submit(fn)) for _, timeout, fn in sources]
+
+    # Collect in a fixed order (policy, product, KG) so prompts stay stable
     ctx: List[Dict] = []
+    degraded = False
+    for deadline, fut in futures:
+        try:
+            ctx += fut.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            fut.cancel()  # too slow: answer without this source
+            degraded = True
+        except Exception:
+            degraded = True  # keep going even if one side fails
+    return ctx, degraded
 
-    # Policy
-    os.environ["QDRANT_COLLECTION"] = POLICY_COLL
+
+def retrieve_context_many(questions: List[str], k_policy=2, k_product=1,
+                          k_kg=2) -> List[Tuple[List[Dict], bool]]:
+    """
+    Batched _retrieve_parallel for offline runs: one embed pass and one Qdrant batch
+    search per collection for all questions, KG lookups fanned out on the pool.
+    Result i is (fused context, degraded) for questions[i].
+    """
+    retriever = get_retriever()
+    kg_futures = [_retrieval_pool.submit(_kg_facts, q, k_kg) for q in questions]
+    qdrant_failed = False
     try:
-        ctx += retrieve(user_q, k=k_policy)
+        policy = retriever.retrieve_many(questions, k=k_policy, collection=POLICY_COLL,
+                                         filters={"domain": "policy"})
     except Exception:
-        pass  # keep going even if one side fails
-
-    # Product
-    os.environ["QDRANT_COLLECTION"] = PRODUCT_COLL
+        policy = [[] for _ in questions]
+        qdrant_failed = True
     try:
-        ctx += retrieve(user_q, k=k_product)
+        # vectors come from the query-embedding cache after the policy pass
+        product = retriever.retrieve_many(questions, k=k_product, collection=PRODUCT_COLL,
+                                          filters={"domain": "product"})
     except Exception:
-        pass
+        product = [[] for _ in questions]
+        qdrant_failed = True
+
+    deadline = time.monotonic() + KG_TIMEOUT_S
+    out = []
+    for pol, prod, fut in zip(policy, product, kg_futures):
+        degraded = qdrant_failed
+        try:
+            kg = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            fut.cancel()
+            kg, degraded = [], True
+        except Exception:
+            kg, degraded = [], True
+        out.append((pol + prod + kg, degraded))
+    return out
+
 
-    # KG
-    ctx += _kg_facts(user_q, limit=2)
+def _timed_retrieve(user_q: str):
+    t0 = time.monotonic()
+    ctx, degraded = _retrieve_parallel(user_q)
+    return ctx, degraded, time.monotonic() - t0
 
-    return ctx
 
+def speculation_stats() -> Dict:
+    """How often speculative retrieval was used vs thrown away, and wall time it saved."""
+    with _spec_lock:
+        out = dict(_spec_stats)
+    out["use_rate"] = out["used"] / out["launched"] if out["launched"] else 0.0
+    return out
 
-def agent_answer(user_q: str) -> Dict:
+
+def kg_cache_stats() -> Dict:
+    """KG lookup cache size, hits/misses, hit_ratio, evictions and invalidations ({} when disabled)."""
+    return kg_cache.stats() if kg_cache is not None else {}
+
+
+def agent_answer(user_q: str, speculative: bool = None, use_cache: bool = True,
+                 on_token: Optional[Callable[[str], None]] = None,
+                 context: Optional[List[Dict]] = None, degraded: bool = False) -> Dict:
     """
     The one-call agent entrypoint:
+    - Near-duplicate of an already answered question: return the cached answer (no LLM).
     - Decide SEARCH vs ANSWER with empty context.
     - If SEARCH: gather parallel context (policy+product+KG) and do RAG answer.
     - If ANSWER: return the direct answer.
-    Returns a dict with keys: mode, answer, context (list), decision (raw).
+    With speculative=True (default: SPECULATIVE_RETRIEVAL env) retrieval starts while
+    agent_decide is still generating and is discarded if the decision is ANSWER.
+    on_token receives the RAG answer tokens as they stream in.
+    context: already-retrieved context (batch mode); used instead of retrieving on SEARCH.
+    degraded: `context` is missing a source (see retrieve_context_many).
+    Returns a dict with keys: mode, answer, context (list), decision (raw), metrics
+    (TTFT / tokens per second per LLM call); RAG answers also carry degraded (a source
+    was dropped). Cached answers carry "cache" instead; degraded answers are never cached.
     """
-    decision = agent_decide(user_q, context_text="")
-    action = (decision.get("action") or "").upper()
+    if not (use_cache and answer_cache is not None):
+        return _agent_answer(user_q, speculative, on_token, context, degraded)
+
+    vec = get_retriever().embed(user_q)  # query-embedding cache makes the retrieval re-embed free
+    hit = answer_cache.lookup(vec)
+    if hit is not None:
+        return hit
+    resp = _agent_answer(user_q, speculative, on_token, context, degraded)
+    if not resp.get("degraded"):  # partial context: let the next ask retry the full fan-out
+        answer_cache.store(vec, user_q, {k: v for k, v in resp.items() if k != "metrics"})
+    return resp
+
 
-    if action == "SEARCH":
-        ctx = _retrieve_parallel(user_q)
-        prompt = build_prompt(user_q, ctx)
-        ans = answer_with_ollama(prompt, model=OLLAMA_MODEL)
-        return {"mode": "RAG_SEARCH", "answer": ans, "context": ctx, "decision": decision, "prompt": prompt}
+def _agent_answer(user_q: str, speculative: bool = None,
+                  on_token: Optional[Callable[[str], None]] = None,
+                  context: Optional[List[Dict]] = None, degraded: bool = False) -> Dict:
+    if speculative is None:
+        speculative = SPECULATIVE_RETRIEVAL and context is None
+
+    spec = None
+    if speculative:
+        spec = _speculation_pool.submit(_timed_retrieve, user_q)
+        with _spec_lock:
+            _spec_stats["launched"] += 1
+
+    metrics: Dict = {"decide": {}}
+    decision = agent_decide(user_q, context_text="", metrics=metrics["decide"])
+    action = (decision.get("action") or "").upper()
 
     # Direct answer (no retrieval)
     if action == "ANSWER":
-        return {"mode": "DIRECT", "answer": decision.get("answer", ""), "context": [], "decision": decision, "prompt": None}
+        if spec is not None:
+            spec.cancel()  # no-op if already running; the result is simply dropped
+            with _spec_lock:
+                _spec_stats["discarded"] += 1
+        return {"mode": "DIRECT", "answer": decision.get("answer", ""), "context": [], "decision": decision, "prompt": None,
+                "metrics": metrics}
+
+    # SEARCH (or unparseable decision -> fallback safety)
+    if spec is not None:
+        t_wait = time.monotonic()
+        ctx, degraded, retrieval_s = spec.result()
+        waited_s = time.monotonic() - t_wait
+        with _spec_lock:
+            _spec_stats["used"] += 1
+            # the part of retrieval that ran while agent_decide was generating
+            _spec_stats["saved_s"] += max(0.0, retrieval_s - waited_s)
+    elif context is not None:
+        ctx = context
+    else:
+        ctx, degraded = _retrieve_parallel(user_q)
 
-    # Fallback safety
-    ctx = _retrieve_parallel(user_q)
     prompt = build_prompt(user_q, ctx)
-    ans = answer_with_ollama(prompt, model=OLLAMA_MODEL)
-    return {"mode": "RAG_SEARCH", "answer": ans, "context": ctx, "decision": decision, "prompt": prompt}
+    metrics["answer"] = {}
+    ans = answer_with_ollama(prompt, model=OLLAMA_MODEL, on_token=on_token, metrics=metrics["answer"])
+    return {"mode": "RAG_SEARCH", "answer": ans, "context": ctx, "decision": decision, "prompt": prompt,
+            "degraded": degraded, "metrics": metrics}
 
 
-if __name__ == "__main__":
-    import sys
-    q = " ".join(sys.argv[1:]) or "refund for late bakery delivery on Sunday"
-    resp = agent_answer(q)
-
+def print_response(resp: Dict, streamed: bool = False) -> None:
+    """CLI output shared by `python -m app.agent` and run_agent.py."""
+    if not streamed:
+        print("\n=== ANSWER ===\n", resp["answer"])
     print("\n=== MODE ===\n", resp["mode"])
-    print("\n=== ANSWER ===\n", resp["answer"])
     if resp["mode"] == "RAG_SEARCH":
         print("\n=== CONTEXT TITLES ===")
         for i, c in enumerate(resp["context"], 1):
             print(f"[{i}] {c.get('title')}")
     print("\n=== DECISION ===\n", json.dumps(resp["decision"], indent=2))
+    if resp.get("metrics"):
+        print("\n=== LLM ===")
+        for call, m in resp["metrics"].items():
+            print(f"{call:<7} {format_metrics(m)}")
+    if SPECULATIVE_RETRIEVAL:
+        print("\n=== SPECULATION ===\n", json.dumps(speculation_stats(), indent=2))
+    if kg_cache is not None and resp["mode"] == "RAG_SEARCH":
+        print("\n=== KG CACHE ===\n", json.dumps(kg_cache_stats(), indent=2))
+
+
+def answer_cli(q: str) -> Dict:
+    """Run agent_answer printing RAG answer tokens as they arrive, then the summary."""
+    streamed = []
+
+    def on_token(token: str):
+        if not streamed:
+            print("\n=== ANSWER ===\n", end=" ", flush=True)
+        streamed.append(token)
+        print(token, end="", flush=True)
+
+    resp = agent_answer(q, on_token=on_token)
+    if streamed:
+        print()
+    print_response(resp, streamed=bool(streamed))
+    return resp
+
+
+if __name__ == "__main__":
+    import sys
+    q = " ".join(sys.argv[1:]) or "refund for late bakery delivery on Sunday"
+    get_retriever(warmup=True)
+    answer_cli(q)
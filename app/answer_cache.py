@@ -0,0 +1,126 @@
+# app/answer_cache.py
+import copy
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.kb_versions import versions_of
+
+
+class SemanticAnswerCache:
+    """
+    Nearest-neighbour cache of previously answered questions.
+    lookup() embeds nothing itself: pass the query vector (bge vectors, cosine).
+    - threshold: min cosine similarity to reuse an answer
+    - ttl:       seconds an answer stays valid
+    - maxsize:   entry bound; least recently used entries are evicted first
+    - kb_names:  KB version stamps (app/kb_versions.py); any bump clears the cache
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 24 * 3600, maxsize: int = 1000,
+                 kb_names: Sequence[str] = ()):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.kb_names = tuple(kb_names)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._versions = versions_of(self.kb_names)
+        self._vecs: List[np.ndarray] = []
+        self._entries: List[Dict] = []  # {"question", "response", "created", "last_used"}
+        self._matrix: Optional[np.ndarray] = None  # stacked _vecs, rebuilt lazily
+
+    @staticmethod
+    def _unit(vec) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    def _check_versions(self):
+        current = versions_of(self.kb_names)
+        if current != self._versions:
+            self._versions = current
+            self._vecs, self._entries, self._matrix = [], [], None
+            self.invalidations += 1
+
+    def _drop(self, idxs: Sequence[int]):
+        for i in sorted(idxs, reverse=True):
+            del self._vecs[i]
+            del self._entries[i]
+        self._matrix = None
+
+    def lookup(self, vec) -> Optional[Dict]:
+        """Cached response (deep copy) for the closest question above threshold, else None."""
+        q = self._unit(vec)
+        with self._lock:
+            self._check_versions()
+            now = time.time()
+            expired = [i for i, e in enumerate(self._entries) if now - e["created"] > self.ttl]
+            if expired:
+                self._drop(expired)
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._matrix = np.stack(self._vecs)
+            sims = self._matrix @ q
+            best = int(np.argmax(sims))
+            if float(sims[best]) < self.threshold:
+                self.misses += 1
+                return None
+            entry = self._entries[best]
+            entry["last_used"] = now
+            self.hits += 1
+            out = copy.deepcopy(entry["response"])
+            out["cache"] = {"question": entry["question"], "similarity": float(sims[best])}
+            return out
+
+    def store(self, vec, question: str, response: Dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._check_versions()
+            self._vecs.append(self._unit(vec))
+            self._entries.append({
+                "question": question,
+                "response": copy.deepcopy(response),
+                "created": now,
+                "last_used": now,
+            })
+            self._matrix = None
+            if len(self._entries) > self.maxsize:
+                lru = min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])
+                self._drop([lru])
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vecs, self._entries, self._matrix = [], [], None
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def cache_from_env(kb_names: Sequence[str]) -> Optional[SemanticAnswerCache]:
+    """ANSWER_CACHE=0 disables; threshold/TTL/size via ANSWER_CACHE_* env vars."""
+    if os.getenv("ANSWER_CACHE", "1") != "1":
+        return None
+    return SemanticAnswerCache(
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+        ttl=float(os.getenv("ANSWER_CACHE_TTL_S", str(24 * 3600))),
+        maxsize=int(os.getenv("ANSWER_CACHE_SIZE", "1000")),
+        kb_names=kb_names,
+    )
@@ -0,0 +1,169 @@
+# app/batch.py
+"""
+Bulk offline answering for a JSONL of questions (e.g. a ticket export).
+
+Each input line needs a question ("question" / "query" / "body" / "title")
+and ideally an id ("id" / "request_id"; the line number is used otherwise).
+Retrieval runs for a whole batch at once. The LLM calls of that batch then
+run on a worker pool while the next batch is being retrieved. Results go
+to the output JSONL as soon as each finishes. The output file doubles as
+the checkpoint: a rerun skips every id already in it, so an interrupted
+run resumes where it stopped.
+
+Run from repo root:
+  python -m app.batch tickets.jsonl answers.jsonl --concurrency 2 --batch-size 32
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+
+from app.agent import agent_answer, retrieve_context_many
+from app.rag_mistral import build_prompt, answer_with_ollama, get_retriever
+
+QUESTION_KEYS = ("question", "query", "body", "title")
+ID_KEYS = ("id", "request_id")
+
+
+def load_checkpoint(out_path: Path) -> Set[str]:
+    """Ids already answered in `out_path`; drops a torn last line from a killed run."""
+    done: Set[str] = set()
+    if not out_path.exists():
+        return done
+    good_bytes = 0
+    with out_path.open("rb") as f:
+        for raw in f:
+            try:
+                done.add(str(json.loads(raw)["id"]))
+            except (ValueError, KeyError):
+                break
+            good_bytes += len(raw)
+    if good_bytes < out_path.stat().st_size:
+        with out_path.open("r+b") as f:
+            f.truncate(good_bytes)
+    return done
+
+
+def iter_questions(in_path: Path, done: Set[str]) -> Iterator[Tuple[str, str]]:
+    """(id, question) for every pending input line, read lazily."""
+    with in_path.open(encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                print(f"[WARN] {in_path}:{lineno}: not valid JSON, skipped", file=sys.stderr)
+                continue
+            qid = next((str(rec[k]) for k in ID_KEYS if rec.get(k) is not None), str(lineno))
+            question = next((rec[k] for k in QUESTION_KEYS if rec.get(k)), None)
+            if question and qid not in done:
+                yield qid, question.strip()
+
+
+def _batches(it: Iterator, size: int) -> Iterator[List]:
+    batch = []
+    for item in it:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def answer_one(qid: str, question: str, ctx: List[Dict], mode: str, degraded: bool = False) -> Dict:
+    t0 = time.perf_counter()
+    if mode == "agent":
+        resp = agent_answer(question, context=ctx, degraded=degraded)
+    else:
+        prompt = build_prompt(question, ctx)
+        resp = {"mode": "RAG_SEARCH", "answer": answer_with_ollama(prompt), "context": ctx}
+    return {
+        "id": qid,
+        "question": question,
+        "mode": resp["mode"],
+        "answer": resp["answer"],
+        "context_titles": [c.get("title") for c in resp.get("context", [])],
+        "decision": resp.get("decision"),
+        "latency_s": round(time.perf_counter() - t0, 3),
+    }
+
+
+def run(in_path: Path, out_path: Path, concurrency: int = 2, batch_size: int = 32,
+        mode: str = "agent") -> Dict:
+    done = load_checkpoint(out_path)
+    if done:
+        print(f"Resuming: {len(done)} already answered in {out_path}")
+    get_retriever(warmup=True)
+
+    answered = failed = 0
+    t0 = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm")
+    inflight = set()
+    qid_of = {}  # future -> question id, for error reports
+
+    with out_path.open("a", encoding="utf-8") as out:
+
+        def drain(max_pending: int):
+            nonlocal inflight, answered, failed
+            while len(inflight) > max_pending:
+                finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    qid = qid_of.pop(fut)
+                    try:
+                        rec = fut.result()
+                    except Exception as e:
+                        failed += 1  # not checkpointed -> retried on the next run
+                        print(f"[WARN] {qid}: {type(e).__name__}: {e}", file=sys.stderr)
+                        continue
+                    out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    out.flush()
+                    answered += 1
+                    if answered % 50 == 0:
+                        rate = answered / (time.perf_counter() - t0) * 60
+                        print(f"... {answered} answered ({rate:.1f} q/min)")
+
+        for batch in _batches(iter_questions(in_path, done), batch_size):
+            # retrieval for this batch overlaps with the LLM calls still running from the last one
+            ctxs = retrieve_context_many([q for _, q in batch])
+            for (qid, question), (ctx, degraded) in zip(batch, ctxs):
+                fut = pool.submit(answer_one, qid, question, ctx, mode, degraded)
+                qid_of[fut] = qid
+                inflight.add(fut)
+            # keep at most ~one batch queued behind the workers (bounded memory)
+            drain(max_pending=batch_size + concurrency)
+        drain(max_pending=0)
+
+    pool.shutdown()
+    elapsed = time.perf_counter() - t0
+    summary = {
+        "answered": answered,
+        "failed": failed,
+        "skipped_from_checkpoint": len(done),
+        "elapsed_s": round(elapsed, 2),
+        "questions_per_min": round(answered / elapsed * 60, 2) if elapsed > 0 else 0.0,
+    }
+    print("\n--- Batch summary ---")
+    for k, v in summary.items():
+        print(f"{k}: {v}")
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input", type=Path)
+    ap.add_argument("output", type=Path)
+    ap.add_argument("--concurrency", type=int, default=2, help="parallel LLM calls")
+    ap.add_argument("--batch-size", type=int, default=32, help="questions retrieved together")
+    ap.add_argument("--mode", choices=["agent", "rag"], default="agent",
+                    help="agent: decide + answer; rag: always answer from retrieved context")
+    args = ap.parse_args()
+    run(args.input, args.output, args.concurrency, args.batch_size, args.mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# app/embed_cache.py
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.lru import LRUCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: no inter-process lock, keep one writer per directory
+    fcntl = None
+
+
+class DiskVectorStore:
+    """
+    Append-only float32 vectors on disk, addressed by string key.
+      <dir>/meta.json    {"model": ..., "dim": 384}
+      <dir>/vectors.f32  rows x dim float32 matrix (np.memmap, grown by doubling)
+      <dir>/index.tsv    one "<key>\\t<row>" line per stored vector
+    Vectors are only valid for the model that produced them, so opening the
+    store with a different model name wipes it (readonly=True just sees it empty).
+    Several processes may write one directory: appends hold an flock on <dir>/.lock
+    and first catch up on rows other writers appended to index.tsv.
+    """
+
+    META = "meta.json"
+    VECTORS = "vectors.f32"
+    INDEX = "index.tsv"
+    LOCK = ".lock"
+
+    def __init__(self, path: str, model_name: str, initial_capacity: int = 1024, readonly: bool = False):
+        self.dir = Path(path)
+        self.readonly = readonly
+        if not readonly:
+            self.dir.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._mm: Optional[np.memmap] = None
+        self.dim: Optional[int] = None
+        self.rows = 0
+        self._index_pos = 0  # bytes of index.tsv already applied to _index
+
+        with self._file_lock():
+            meta = self._read_meta()
+            if meta.get("model") != model_name:
+                if not readonly:
+                    self._reset()
+            else:
+                self.dim = meta.get("dim")
+                self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive inter-process lock for writers (no-op for readers / without fcntl)."""
+        if self.readonly or fcntl is None:
+            yield
+            return
+        with (self.dir / self.LOCK).open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ---- persistence ----
+    def _read_meta(self) -> Dict:
+        p = self.dir / self.META
+        try:
+            return json.loads(p.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_meta(self):
+        (self.dir / self.META).write_text(
+            json.dumps({"model": self.model_name, "dim": self.dim}), encoding="utf-8"
+        )
+
+    def _reset(self):
+        for name in (self.VECTORS, self.INDEX):
+            try:
+                (self.dir / name).unlink()
+            except FileNotFoundError:
+                pass
+        self.dim = None
+        self.rows = 0
+        self._index = {}
+        self._index_pos = 0
+        self._write_meta()
+
+    def _load(self):
+        if not self.dim or not (self.dir / self.VECTORS).exists():
+            return
+        self._open_memmap()
+        self._read_index_tail()
+
+    def _read_index_tail(self):
+        """Apply index.tsv lines appended since the last read (by this or another process)."""
+        idx_path = self.dir / self.INDEX
+        if not idx_path.exists():
+            return
+        with idx_path.open("rb") as f:
+            f.seek(self._index_pos)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # a torn last line (crash mid-append) waits for its newline
+        if not end:
+            return
+        self._index_pos += end
+        if self._mm is None or self._mm.shape[0] * 4 * self.dim < (self.dir / self.VECTORS).stat().st_size:
+            self._open_memmap()  # another writer grew the file
+        capacity = self._mm.shape[0]
+        for line in data[:end].decode("utf-8").splitlines():
+            key, _, row = line.partition("\t")
+            if row.isdigit() and int(row) < capacity:
+                self._index[key] = int(row)
+        self.rows = max(self._index.values(), default=-1) + 1
+
+    def _open_memmap(self, capacity: Optional[int] = None):
+        vec_path = self.dir / self.VECTORS
+        row_bytes = 4 * self.dim
+        if capacity is not None:
+            with vec_path.open("ab") as f:
+                if capacity * row_bytes > f.seek(0, os.SEEK_END):  # grow only: never cut another writer's rows
+                    f.truncate(capacity * row_bytes)
+        capacity = vec_path.stat().st_size // row_bytes
+        mode = "r" if self.readonly else "r+"
+        self._mm = np.memmap(vec_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+
+    def _ensure_capacity(self, needed: int):
+        if self._mm is None:
+            self._open_memmap(max(self.initial_capacity, needed))
+        if needed > self._mm.shape[0]:
+            self._mm.flush()
+            new_cap = self._mm.shape[0]
+            while new_cap < needed:
+                new_cap *= 2
+            self._mm = None
+            self._open_memmap(new_cap)
+
+    # ---- public API ----
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            out = []
+            for key in keys:
+                row = self._index.get(key)
+                out.append(None if row is None else np.array(self._mm[row]))
+            return out
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence) -> None:
+        if not keys:
+            return
+        if self.readonly:
+            raise RuntimeError(f"{self.dir} was opened read-only")
+        with self._lock, self._file_lock():
+            if self.dim is None:
+                self.dim = self._read_meta().get("dim")  # another writer may have stored first
+            if self.dim is not None:
+                self._read_index_tail()
+            new = [(k, v) for k, v in zip(keys, vectors) if k not in self._index]
+            if not new:
+                return
+            if self.dim is None:
+                self.dim = int(len(new[0][1]))
+                self._write_meta()
+            start = self.rows
+            self._ensure_capacity(start + len(new))
+            for i, (_, vec) in enumerate(new):
+                self._mm[start + i] = np.asarray(vec, dtype=np.float32)
+            self._mm.flush()
+            # vectors are on disk before their keys, so the index never points at garbage
+            with (self.dir / self.INDEX).open("a", encoding="utf-8") as f:
+                for i, (key, _) in enumerate(new):
+                    f.write(f"{key}\t{start + i}\n")
+                    self._index[key] = start + i
+                self._index_pos = f.tell()
+            self.rows = start + len(new)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def normalize_query(text: str) -> str:
+    """Case/whitespace/trailing-punctuation insensitive form used as the cache key."""
+    return " ".join((text or "").lower().split()).rstrip(" ?!.")
+
+
+class QueryEmbeddingCache:
+    """
+    Cache in front of the query embedder.
+    Key = (embedding model, normalized query). Bounded in-memory LRU, plus an
+    optional DiskVectorStore so hot queries survive restarts.
+    """
+
+    def __init__(self, model_name: str, maxsize: int = 4096, disk_path: Optional[str] = None):
+        self.model_name = model_name
+        self.memory = LRUCache(maxsize=maxsize)
+        self.disk = DiskVectorStore(disk_path, model_name) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _disk_key(self, norm: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\n{norm}".encode("utf-8")).hexdigest()
+
+    def embed(self, queries: Sequence[str], embed_fn: Callable[[List[str]], List]) -> List:
+        """Vectors for `queries` in order; only cache misses go to embed_fn (as one batch)."""
+        norms = [normalize_query(q) for q in queries]
+        out: List = [self.memory.get((self.model_name, n)) for n in norms]
+
+        missing = [i for i, v in enumerate(out) if v is None]
+        disk_found = 0
+        if missing and self.disk is not None:
+            found = self.disk.get_many([self._disk_key(norms[i]) for i in missing])
+            for i, vec in zip(missing, found):
+                if vec is not None:
+                    out[i] = vec
+                    self.memory.put((self.model_name, norms[i]), vec)
+                    disk_found += 1
+            missing = [i for i in missing if out[i] is None]
+
+        if missing:
+            # de-dup within the batch so repeated questions are embedded once
+            first: Dict[str, str] = {}
+            for i in missing:
+                first.setdefault(norms[i], queries[i])
+            todo = list(first)
+            vecs = embed_fn([first[n] for n in todo])
+            by_norm = dict(zip(todo, vecs))
+            for n, vec in by_norm.items():
+                self.memory.put((self.model_name, n), vec)
+            if self.disk is not None:
+                self.disk.put_many([self._disk_key(n) for n in todo], vecs)
+            for i in missing:
+                out[i] = by_norm[norms[i]]
+
+        with self._lock:
+            self.misses += len(missing)
+            self.disk_hits += disk_found
+            self.hits += len(queries) - len(missing)
+        return out
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "memory_size": len(self.memory),
+            "disk_size": len(self.disk) if self.disk is not None else 0,
+        }
+
+
+def cache_from_env(model_name: str) -> QueryEmbeddingCache:
+    """QUERY_CACHE_SIZE bounds the LRU; QUERY_CACHE_DIR (optional) enables the on-disk store."""
+    return QueryEmbeddingCache(
+        model_name,
+        maxsize=int(os.getenv("QUERY_CACHE_SIZE", "4096")),
+        disk_path=os.getenv("QUERY_CACHE_DIR") or None,
+    )
@@ -0,0 +1,67 @@
+# app/kb_versions.py
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: bumps are only serialized within one process
+    fcntl = None
+
+# One small JSON file of {kb_name: version}. Ingestion bumps it; caches compare against it.
+KB_VERSIONS_PATH = Path(os.getenv("KB_VERSIONS_PATH", "kb_versions.json"))
+
+_lock = threading.Lock()
+_cached: Dict[Path, Tuple[float, Dict[str, int]]] = {}   # path -> (mtime, versions)
+
+
+def read_versions(path: Path = KB_VERSIONS_PATH) -> Dict[str, int]:
+    """Current version stamps; re-read only when the file's mtime changes."""
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    with _lock:
+        cached = _cached.get(path, (-1.0, {}))
+        if cached[0] != mtime:
+            try:
+                cached = _cached[path] = (mtime, json.loads(path.read_text(encoding="utf-8")))
+            except ValueError:
+                pass  # caught a half-written file; keep the last good one
+        return dict(cached[1])
+
+
+def versions_of(names: Iterable[str], path: Path = KB_VERSIONS_PATH) -> Tuple[int, ...]:
+    current = read_versions(path)
+    return tuple(current.get(n, 0) for n in names)
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Exclusive lock across processes (ingest runs bump concurrently); no-op without fcntl."""
+    if fcntl is None:
+        yield
+        return
+    with path.with_name(path.name + ".lock").open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def bump_version(name: str, path: Path = KB_VERSIONS_PATH) -> int:
+    """Call after (re)ingesting a KB so dependent caches drop stale entries."""
+    with _lock, _file_lock(path):
+        try:
+            current = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            current = {}
+        current[name] = int(current.get(name, 0)) + 1
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        os.replace(tmp, path)  # atomic: readers never see a partial file
+        return current[name]
@@ -0,0 +1,191 @@
+# app/ollama_client.py
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")  # change if tunneling
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")        # keep the model resident between bursts
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "8"))
+OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES", "3"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "600"))       # headroom for first token on cold load
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class OllamaClient:
+    """
+    Shared Ollama /api/generate client:
+    - one pooled keep-alive requests.Session (connection reuse across calls/threads)
+    - keep_alive sent with every request so the model stays loaded
+    - retries with jittered exponential backoff on connection errors / 429 / 5xx
+    - sync generate()/stream() and asyncio agenerate()/astream()
+    """
+
+    def __init__(self, base_url: str = OLLAMA_URL, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 pool_size: int = OLLAMA_POOL_SIZE, max_retries: int = OLLAMA_RETRIES,
+                 backoff_s: float = 0.5, timeout: float = OLLAMA_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # ---- plumbing ----
+    def _payload(self, prompt: str, model: str, stream: bool,
+                 temperature: float, options: Optional[Dict]) -> Dict:
+        return {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": temperature, **(options or {})},
+        }
+
+    def _sleep_backoff(self, attempt: int):
+        # "full jitter": spreads retries from concurrent callers instead of syncing them up
+        time.sleep(random.uniform(0, self.backoff_s * (2 ** (attempt - 1))))
+
+    def _post(self, payload: Dict, stream: bool, timeout: Optional[float]) -> requests.Response:
+        last_exc: Optional[Exception] = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                r = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                      stream=stream, timeout=timeout or self.timeout)
+                if r.status_code in _RETRY_STATUS and attempt < self.max_retries:
+                    r.close()
+                    self._sleep_backoff(attempt)
+                    continue
+                r.raise_for_status()
+                return r
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_exc = e
+                if attempt < self.max_retries:
+                    self._sleep_backoff(attempt)
+        raise RuntimeError(f"Ollama request failed after {self.max_retries} attempts") from last_exc
+
+    # ---- sync API ----
+    def generate(self, prompt: str, model: str, temperature: float = 0.2,
+                 options: Optional[Dict] = None, timeout: Optional[float] = None) -> str:
+        """Non-streaming generation; returns the raw response text."""
+        r = self._post(self._payload(prompt, model, False, temperature, options), False, timeout)
+        data = r.json()
+        if "error" in data:
+            raise RuntimeError(f"Ollama error: {data['error']}")
+        return data.get("response", "")
+
+    def stream(self, prompt: str, model: str, temperature: float = 0.2,
+               options: Optional[Dict] = None, metrics: Optional[Dict] = None,
+               timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Yield response tokens from Ollama's NDJSON stream as they are decoded.
+        If `metrics` is given it is filled with ttft_s, total_s, tokens and tokens_per_s
+        (also when the caller stops early; closing the generator aborts the generation).
+        Retries only cover getting the stream started, never a half-consumed one.
+        An {"error": ...} line (OOM, model unloaded) or a stream that ends before its
+        done line raises RuntimeError instead of passing off a truncated answer.
+        """
+        t0 = time.perf_counter()
+        t_first = None
+        n_tokens = 0
+        final: Dict = {}
+        try:
+            r = self._post(self._payload(prompt, model, True, temperature, options), True, timeout)
+            with r:
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(f"Ollama error mid-generation: {chunk['error']}")
+                    token = chunk.get("response", "")
+                    if token:
+                        if t_first is None:
+                            t_first = time.perf_counter()
+                        n_tokens += 1
+                        yield token
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+                else:
+                    raise RuntimeError("Ollama stream ended before the done line")
+        finally:
+            if metrics is not None:
+                t_end = time.perf_counter()
+                metrics["ttft_s"] = (t_first - t0) if t_first is not None else None
+                metrics["total_s"] = t_end - t0
+                metrics["tokens"] = final.get("eval_count", n_tokens)
+                # prefer Ollama's own decode timing; fall back to wall clock after first token
+                if final.get("eval_duration"):
+                    metrics["tokens_per_s"] = metrics["tokens"] / (final["eval_duration"] / 1e9)
+                elif t_first is not None and t_end > t_first:
+                    metrics["tokens_per_s"] = n_tokens / (t_end - t_first)
+                else:
+                    metrics["tokens_per_s"] = None
+
+    def preload(self, model: str) -> None:
+        """Load `model` into memory (empty prompt) so the first real request skips the cold load."""
+        self._post({"model": model, "prompt": "", "stream": False, "keep_alive": self.keep_alive}, False, None)
+
+    def close(self) -> None:
+        self.session.close()
+
+    # ---- asyncio API (runs the pooled sync client off the event loop) ----
+    async def agenerate(self, prompt: str, model: str, **kwargs) -> str:
+        return await asyncio.to_thread(self.generate, prompt, model, **kwargs)
+
+    async def astream(self, prompt: str, model: str, **kwargs) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def pump():
+            gen = self.stream(prompt, model, **kwargs)
+            try:
+                for token in gen:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, token)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                gen.close()
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        worker = loop.run_in_executor(None, pump)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()  # consumer went away: stop reading, which aborts the generation
+            await asyncio.shield(worker)
+
+
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """Process-wide OllamaClient (one connection pool per process)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+    return _client
@@ -1,47 +1,214 @@
 import os
-import requests
-from typing import List, Dict
+import threading
+from typing import Any, Callable, Iterator, List, Dict, Optional, Sequence, Tuple
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from qdrant_client.models import Filter, FieldCondition, MatchAny, MatchValue, SearchRequest
 from fastembed import TextEmbedding
 
+from app.embed_cache import cache_from_env
+from app.kb_versions import versions_of
+from app.ollama_client import get_ollama_client
+from app.vector_storage import connect, profile_of, search_params
+
 
 # ---- CONFIG ----
 QDRANT_PATH = os.getenv("QDRANT_PATH", "db.qdrant")
 COLLECTION = os.getenv("QDRANT_COLLECTION", "kb_policy_policy_chunks")
-OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")  # change if tunneling
 MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "phi3:mini")           # Ollama name for mistral-7b-instruct
 TOP_K = int(os.getenv("TOP_K", "3"))
+EMBED_MODEL = os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5")  # must match ingestion
+QUERY_EMBED_BATCH = int(os.getenv("QUERY_EMBED_BATCH", "64"))
+RESCORE_OVERSAMPLING = float(os.getenv("RESCORE_OVERSAMPLING", "0")) or None  # 0 = per-profile default
+
+# Domain filter keeps it to policy KB unless the caller scopes it differently
+DEFAULT_FILTERS = {"domain": "policy"}
+
+# Payload fields each KB collection can be filtered on, i.e. what its loader stores.
+# A field a collection doesn't carry would match nothing and silently empty the context.
+FILTER_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "kb_policy_policy_chunks": ("domain", "brand", "policy_title"),   # chunks of data/policies.jsonl
+    "kb_policy_faqs": ("domain", "brand", "section"),
+    "kb_product_faqs": ("domain", "brand", "category"),
+}
+
+
+def check_filters(filters: Optional[Dict[str, Any]], collection: str = COLLECTION) -> None:
+    """ValueError if `filters` names a field `collection` doesn't store (unknown collections pass)."""
+    allowed = FILTER_FIELDS.get(collection)
+    unknown = sorted(set(filters or {}) - set(allowed)) if allowed else []
+    if unknown:
+        raise ValueError(f"cannot filter {collection} on {', '.join(unknown)}; "
+                         f"use {', '.join(allowed)}")
+
+
+def build_filter(filters: Optional[Dict[str, Any]]) -> Optional[Filter]:
+    """
+    {"domain": "policy", "brand": "Tesco", "category": ["Dairy", "Bakery"]} -> Qdrant Filter.
+    All fields must match; a list matches any of its values; None values are ignored.
+    domain/brand/section/category are keyword-indexed (app/vector_storage.py).
+    """
+    conditions = []
+    for key, value in (filters or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            conditions.append(FieldCondition(key=key, match=MatchAny(any=list(value))))
+        else:
+            conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
+    return Filter(must=conditions) if conditions else None
+
+
+def _hit_to_ctx(h) -> Dict:
+    p = h.payload or {}
+    return {
+        # chunk collections carry policy_title/text, FAQ collections question/answer
+        "title": p.get("policy_title") or p.get("question"),
+        "url": p.get("source_url"),
+        "text": p.get("text") or p.get("answer"),
+        "score": h.score
+    }
+
+
+class Retriever:
+    """
+    Long-lived retrieval handle: one Qdrant client + one embedder per process.
+    Loading the ONNX model and opening the local store is the expensive part,
+    so build this once (see get_retriever) and share it between threads.
+    """
+
+    def __init__(self, path: str = QDRANT_PATH, collection: str = COLLECTION,
+                 model_name: str = EMBED_MODEL):
+        self.path = path
+        self.collection = collection
+        self.model_name = model_name
+        self.client = connect(path)
+        self.embedder = TextEmbedding(model_name=model_name)
+        # Keyed by model name, so an EMBED_MODEL change never serves stale vectors
+        self.query_cache = cache_from_env(model_name)
+        # Local-mode Qdrant is not thread-safe; the ONNX session is.
+        self._client_lock = threading.Lock()
+        self._search_params: Dict[str, Any] = {}  # collection -> (kb version, SearchParams or None)
+
+    def warmup(self) -> "Retriever":
+        """Run one dummy embedding so the first real question doesn't pay ONNX session init."""
+        self._embed_uncached(["warmup"])  # bypass the cache: the point is to touch the model
+        return self
+
+    def _embed_uncached(self, texts: List[str]) -> List:
+        return list(self.embedder.embed(texts, batch_size=QUERY_EMBED_BATCH))
+
+    def embed(self, query: str):
+        return self.embed_many([query])[0]
+
+    def embed_many(self, queries: Sequence[str]) -> List:
+        """One batched fastembed pass for the cache misses; vectors come back in input order."""
+        if not queries:
+            return []
+        return self.query_cache.embed(list(queries), self._embed_uncached)
+
+    def params_for(self, collection: str):
+        """
+        Oversampling + rescoring for quantized collections. Looked up once per KB
+        version, so a blue/green rebuild (new storage profile behind the same alias)
+        is picked up without a restart.
+        """
+        version = versions_of([collection])[0]
+        cached = self._search_params.get(collection)
+        if cached is None or cached[0] != version:
+            with self._client_lock:
+                info = self.client.get_collection(collection)
+            cached = (version, search_params(profile_of(info), RESCORE_OVERSAMPLING))
+            self._search_params[collection] = cached
+        return cached[1]
 
+    def search(self, query: str, k: int = TOP_K, collection: Optional[str] = None,
+               query_filter: Optional[Filter] = None, vector=None):
+        """Raw Qdrant hits (ScoredPoint) for callers that need the full payload."""
+        vec = self.embed(query) if vector is None else vector
+        collection = collection or self.collection
+        params = self.params_for(collection)
+        with self._client_lock:
+            return self.client.search(
+                collection_name=collection,
+                query_vector=vec,
+                limit=k,
+                query_filter=query_filter,
+                search_params=params,
+                with_payload=True,
+            )
 
-def retrieve(query: str, k: int = TOP_K) -> List[Dict]:
+    def search_many(self, queries: Sequence[str], k: int = TOP_K, collection: Optional[str] = None,
+                    query_filter: Optional[Filter] = None) -> List[List]:
+        """Raw hits for many queries: one embed call + one Qdrant batch search."""
+        vecs = self.embed_many(queries)
+        if not vecs:
+            return []
+        collection = collection or self.collection
+        params = self.params_for(collection)
+        requests_ = [
+            SearchRequest(vector=v.tolist(), filter=query_filter, limit=k, params=params, with_payload=True)
+            for v in vecs
+        ]
+        with self._client_lock:
+            return self.client.search_batch(
+                collection_name=collection,
+                requests=requests_,
+            )
+
+    def retrieve(self, query: str, k: int = TOP_K, collection: Optional[str] = None,
+                 filters: Optional[Dict[str, Any]] = DEFAULT_FILTERS, vector=None) -> List[Dict]:
+        """
+        collection/filters are explicit so concurrent callers can hit different KBs
+        through the same shared Retriever; pass `vector` to reuse an embedding.
+        """
+        hits = self.search(query, k=k, collection=collection,
+                           query_filter=build_filter(filters), vector=vector)
+        return [_hit_to_ctx(h) for h in hits]
+
+    def retrieve_many(self, queries: Sequence[str], k: int = TOP_K,
+                      filters: Optional[Dict[str, Any]] = DEFAULT_FILTERS,
+                      collection: Optional[str] = None) -> List[List[Dict]]:
+        """Batched retrieve(): result i belongs to queries[i]."""
+        batches = self.search_many(queries, k=k, collection=collection,
+                                   query_filter=build_filter(filters))
+        return [[_hit_to_ctx(h) for h in hits] for hits in batches]
+
+    def close(self):
+        with self._client_lock:
+            self.client.close()
+
+
+_retriever: Optional[Retriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever(warmup: bool = False) -> Retriever:
+    """Process-wide Retriever, created lazily on first use (thread-safe)."""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = Retriever()
+    if warmup:
+        _retriever.warmup()
+    return _retriever
+
+
+def query_cache_stats() -> Dict:
+    """Hit/miss counters of the shared query-embedding cache."""
+    return get_retriever().query_cache.stats()
+
+
+def retrieve(query: str, k: int = TOP_K, filters: Optional[Dict[str, Any]] = DEFAULT_FILTERS,
+             collection: Optional[str] = None) -> List[Dict]:
     """Vector search in Qdrant; returns payloads + scores for prompting and citations."""
-    client = QdrantClient(path=QDRANT_PATH)
-    embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-    vec = list(embedder.embed([query]))[0]
-
-    # Domain filter keeps it to policy KB (adjust/add filters later for products/promos)
-    flt = Filter(must=[FieldCondition(key="domain", match=MatchValue(value="policy"))])
-
-    hits = client.search(
-        collection_name=COLLECTION,
-        query_vector=vec,
-        limit=k,
-        query_filter=flt,
-        with_payload=True,
-    )
+    return get_retriever().retrieve(query, k=k, collection=collection, filters=filters)
 
-    out = []
-    for h in hits:
-        p = h.payload or {}
-        out.append({
-            "title": p.get("policy_title"),
-            "url": p.get("source_url"),
-            "text": p.get("text"),
-            "score": h.score
-        })
-    return out
+
+def retrieve_many(queries: Sequence[str], k: int = TOP_K,
+                  filters: Optional[Dict[str, Any]] = DEFAULT_FILTERS) -> List[List[Dict]]:
+    """Batched vector search for offline eval / bulk replay; same order as `queries`."""
+    return get_retriever().retrieve_many(queries, k=k, filters=filters)
 
 
 def build_prompt(user_q: str, ctx: List[Dict]) -> str:
@@ -65,38 +232,57 @@ def build_prompt(user_q: str, ctx: List[Dict]) -> str:
 
 
 
-def answer_with_ollama(prompt: str, model: str = MISTRAL_MODEL) -> str:
-    """Call LLM via Ollama HTTP API."""
-    r = requests.post(
-        f"{OLLAMA_URL}/api/generate",
-        json={
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-            "temperature": 0.2,
-            "options": {"num_predict": 80}  # try 64–128 depending on speed
-        },
-        timeout=600,  # give it more headroom on first token (cold load)
+def stream_with_ollama(prompt: str, model: str = MISTRAL_MODEL,
+                       metrics: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Yield response tokens as they are decoded (shared pooled OllamaClient).
+    If `metrics` is given it is filled with ttft_s, total_s, tokens and tokens_per_s.
+    """
+    return get_ollama_client().stream(
+        prompt, model=model, temperature=0.2,
+        options={"num_predict": 80},  # try 64–128 depending on speed
+        metrics=metrics,
     )
-    r.raise_for_status()
-    data = r.json()
-    return data.get("response", "").strip()
 
 
+def answer_with_ollama(prompt: str, model: str = MISTRAL_MODEL,
+                       on_token: Optional[Callable[[str], None]] = None,
+                       metrics: Optional[Dict] = None) -> str:
+    """Call LLM via Ollama HTTP API (streamed); on_token sees each token as it arrives."""
+    parts = []
+    for token in stream_with_ollama(prompt, model=model, metrics=metrics):
+        parts.append(token)
+        if on_token is not None:
+            on_token(token)
+    return "".join(parts).strip()
+
+
+def format_metrics(m: Dict) -> str:
+    ttft = f"{m['ttft_s']:.2f}s" if m.get("ttft_s") is not None else "n/a"
+    tps = f"{m['tokens_per_s']:.1f}" if m.get("tokens_per_s") else "n/a"
+    return f"ttft={ttft}  total={m.get('total_s', 0):.2f}s  tokens={m.get('tokens')}  tok/s={tps}"
+
 
-def rag_answer(user_query: str, k: int = TOP_K) -> Dict:
-    ctx = retrieve(user_query, k=k)
+def rag_answer(user_query: str, k: int = TOP_K,
+               on_token: Optional[Callable[[str], None]] = None,
+               filters: Optional[Dict[str, Any]] = None) -> Dict:
+    """`filters` (e.g. {"brand": ..., "policy_title": ...}) narrow the default policy scope."""
+    check_filters(filters)
+    ctx = retrieve(user_query, k=k, filters={**DEFAULT_FILTERS, **(filters or {})})
     prompt = build_prompt(user_query, ctx)
-    answer = answer_with_ollama(prompt)
-    return {"answer": answer, "context": ctx, "prompt": prompt}
+    metrics: Dict = {}
+    answer = answer_with_ollama(prompt, on_token=on_token, metrics=metrics)
+    return {"answer": answer, "context": ctx, "prompt": prompt, "metrics": metrics}
 
 
 if __name__ == "__main__":
     import sys
     q = " ".join(sys.argv[1:]) or "What happens if I am not at home during delivery?"
-    resp = rag_answer(q)
+    get_retriever(warmup=True)
     print("\n--- Answer ---\n")
-    print(resp["answer"])
+    resp = rag_answer(q, on_token=lambda t: print(t, end="", flush=True))
+    print("\n\n--- LLM ---\n")
+    print(format_metrics(resp["metrics"]))
 
     print("\n--- Citations ---\n")
     for i, c in enumerate(resp["context"], 1):
@@ -0,0 +1,377 @@
+# app/server.py
+"""
+Long-running asyncio HTTP service for the agent (stdlib only).
+
+  GET  /health                      -> status, in-flight / queued counts, cache hit ratios, KG probe
+  POST /agent  {"question": "..."}  -> agent_answer(question)
+  POST /rag    {"question": "...", "k": 3, "filters": {"brand": "Tesco"}}
+                                    -> rag_answer(question, k, filters=filters)
+
+Backends are loaded and warmed once at startup. At most MAX_CONCURRENCY
+requests run the (LLM-bound) pipeline at a time. Up to MAX_QUEUE more wait
+for a slot, and anything beyond that gets 429 straight away. SIGINT/SIGTERM
+stop accepting, let in-flight work finish (SHUTDOWN_GRACE_S), then close
+the backends.
+
+Run from repo root:  python -m app.server --port 8000
+Local smoke test without Qdrant/Ollama/Neo4j:  python -m app.server --stub
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+PORT = int(os.getenv("SERVER_PORT", "8000"))
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "2"))   # CPU Ollama: keep this small
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", "16"))
+SHUTDOWN_GRACE_S = float(os.getenv("SHUTDOWN_GRACE_S", "30"))
+MAX_BODY = 64 * 1024
+MAX_K = 50
+IDLE_TIMEOUT_S = 30     # wait for the next request line on a keep-alive connection
+READ_TIMEOUT_S = 10     # headers + body of a request, once its request line arrived
+KG_PROBE_TIMEOUT_S = float(os.getenv("KG_PROBE_TIMEOUT_S", "2"))
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            408: "Request Timeout", 413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+async def _no_op(*_) -> Dict:
+    return {}
+
+
+def _log_error(where: str, e: BaseException) -> None:
+    """Full traceback to stderr; clients only get a generic 500 body."""
+    print(f"[ERROR] app/server.py: {where}: {type(e).__name__}: {e}", file=sys.stderr)
+    traceback.print_exception(type(e), e, e.__traceback__, file=sys.stderr)
+
+
+class Backends:
+    """
+    The callables the service fronts, plus their startup/shutdown hooks and cache metrics.
+    astart / aprobe / astop run on the event loop itself (not in the executor), for
+    clients that are bound to the serving loop such as the async Neo4j driver.
+    """
+
+    def __init__(self, agent_fn: Callable[[str], Dict], rag_fn: Callable[..., Dict],
+                 warmup: Optional[Callable[[], None]] = None,
+                 close: Optional[Callable[[], None]] = None,
+                 stats: Optional[Callable[[], Dict]] = None,
+                 astart: Optional[Callable[[], Awaitable]] = None,
+                 aprobe: Optional[Callable[[], Awaitable[Dict]]] = None,
+                 astop: Optional[Callable[[], Awaitable]] = None,
+                 rag_filter_fields: Optional[Tuple[str, ...]] = None):
+        self.agent_fn = agent_fn
+        self.rag_fn = rag_fn
+        self.warmup = warmup or (lambda: None)
+        self.close = close or (lambda: None)
+        self.stats = stats or (lambda: {})
+        self.astart = astart or _no_op
+        self.aprobe = aprobe or _no_op
+        self.astop = astop or _no_op
+        self.rag_filter_fields = rag_filter_fields  # None = don't check /rag filter keys
+
+
+def real_backends() -> Backends:
+    # imported here so --stub works without qdrant/fastembed/neo4j installed
+    from app.agent import agent_answer, kg_cache_stats, OLLAMA_MODEL
+    from app.rag_mistral import rag_answer, get_retriever, COLLECTION, FILTER_FIELDS
+    from app.ollama_client import get_ollama_client
+    from kg.backend import get_kg_backend
+    from kg.config import KG_BACKEND
+
+    def warmup():
+        get_retriever(warmup=True)
+        get_ollama_client().preload(OLLAMA_MODEL)
+        try:
+            get_kg_backend().warmup()  # Neo4j: open pooled Bolt connections; embedded: build the index
+        except Exception as e:
+            # the KG is an optional context source: serve without it rather than not at all
+            print(f"KG warmup failed ({type(e).__name__}: {e}); KG lookups will retry per request")
+
+    def close():
+        get_retriever().close()
+        get_ollama_client().close()
+        get_kg_backend().close()
+
+    backends = Backends(agent_fn=agent_answer, rag_fn=rag_answer, warmup=warmup, close=close,
+                        stats=lambda: {"kg_cache": kg_cache_stats()},
+                        rag_filter_fields=FILTER_FIELDS.get(COLLECTION))
+    if KG_BACKEND != "neo4j":
+        return backends
+
+    # /health probes Neo4j with the async driver on the serving loop, so a slow or
+    # unreachable KG never takes one of the MAX_CONCURRENCY executor slots
+    from kg.connection import aclose, arun_query, awarmup
+
+    async def astart():
+        try:
+            await awarmup()
+        except Exception as e:
+            print(f"KG async warmup failed ({type(e).__name__}: {e}); /health will report it")
+
+    async def aprobe() -> Dict:
+        try:
+            await asyncio.wait_for(arun_query("RETURN 1"), KG_PROBE_TIMEOUT_S)
+            return {"kg": "ok"}
+        except Exception as e:
+            return {"kg": f"unavailable ({type(e).__name__})"}
+
+    backends.astart, backends.aprobe, backends.astop = astart, aprobe, aclose
+    return backends
+
+
+def stub_backends(delay_s: float = 0.5) -> Backends:
+    """Stand-ins with a fixed latency, for exercising concurrency/backpressure locally."""
+
+    def agent_fn(q: str) -> Dict:
+        time.sleep(delay_s)
+        return {"mode": "RAG_SEARCH", "answer": f"stub answer to: {q}", "context": [],
+                "decision": {"action": "SEARCH"}, "prompt": None}
+
+    def rag_fn(q: str, k: int = 3, filters: Optional[Dict] = None) -> Dict:
+        time.sleep(delay_s)
+        return {"answer": f"stub answer to: {q}", "context": [], "prompt": None}
+
+    return Backends(agent_fn=agent_fn, rag_fn=rag_fn)
+
+
+class AnswerService:
+    def __init__(self, backends: Backends, max_concurrency: int = MAX_CONCURRENCY,
+                 max_queue: int = MAX_QUEUE):
+        self.backends = backends
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="answer")
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.inflight = 0   # holding a slot
+        self.waiting = 0    # admitted, queued for a slot
+        self.served = 0
+        self.shed = 0
+        self.draining = False
+        self._idle: Optional[asyncio.Event] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # ---- request handling ----
+    async def _run(self, fn: Callable, *args) -> Tuple[int, Dict]:
+        if self.draining:
+            return 503, {"error": "shutting down"}
+        if self.inflight + self.waiting >= self.max_concurrency + self.max_queue:
+            self.shed += 1
+            return 429, {"error": "overloaded, retry later"}
+        self.waiting += 1
+        self._idle.clear()
+        try:
+            async with self.semaphore:
+                self.waiting -= 1
+                self.inflight += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self.executor, fn, *args)
+                    self.served += 1
+                    return 200, result
+                except Exception as e:
+                    _log_error(getattr(fn, "__name__", "backend"), e)
+                    return 500, {"error": "internal error"}
+                finally:
+                    self.inflight -= 1
+        finally:
+            if self.inflight + self.waiting == 0:
+                self._idle.set()
+
+    async def _health(self) -> Tuple[int, Dict]:
+        body = {
+            "status": "draining" if self.draining else "ok",
+            "inflight": self.inflight,
+            "queued": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "served": self.served,
+            "shed": self.shed,
+            **self.backends.stats(),
+            **(await self.backends.aprobe()),
+        }
+        return (503 if self.draining else 200), body
+
+    async def route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        path = path.split("?", 1)[0]
+        if path == "/health":
+            return await self._health() if method == "GET" else (405, {"error": "use GET"})
+        if path not in ("/agent", "/rag"):
+            return 404, {"error": f"no route {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            req = json.loads(body or b"{}")
+        except ValueError:
+            req = None
+        if not isinstance(req, dict):
+            return 400, {"error": "body must be a JSON object"}
+        question = req.get("question")
+        if question is not None and not isinstance(question, str):
+            return 400, {"error": "'question' must be a string"}
+        question = (question or "").strip()
+        if not question:
+            return 400, {"error": "missing 'question'"}
+        if path == "/agent":
+            return await self._run(self.backends.agent_fn, question)
+        filters = req.get("filters")
+        if filters is not None and not isinstance(filters, dict):
+            return 400, {"error": "'filters' must be an object"}
+        allowed = self.backends.rag_filter_fields
+        unknown = sorted(set(filters or {}) - set(allowed)) if allowed is not None else []
+        if unknown:
+            return 400, {"error": f"unknown filter field(s) {', '.join(unknown)}; use {', '.join(allowed)}"}
+        k = req.get("k", 3)
+        if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= MAX_K:
+            return 400, {"error": f"'k' must be an integer between 1 and {MAX_K}"}
+        rag_fn = functools.partial(self.backends.rag_fn, filters=filters)
+        return await self._run(rag_fn, question, k)
+
+    # ---- minimal HTTP/1.1 ----
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT_S)
+                except asyncio.TimeoutError:
+                    break
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    break
+                method, path, version = parts
+                try:
+                    # one budget for headers + body: a slow or short-body client can't pin
+                    # the connection (it never reaches the 429 admission check)
+                    headers, body = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT_S)
+                except asyncio.TimeoutError:
+                    await self._respond(writer, 408, {"error": "request not received in time"}, keep_alive=False)
+                    break
+                if headers is None:
+                    await self._respond(writer, 400, {"error": "bad Content-Length"}, keep_alive=False)
+                    break
+                if body is None:
+                    await self._respond(writer, 413, {"error": "body too large"}, keep_alive=False)
+                    break
+
+                status, payload = await self.route(method.upper(), path, body)
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                    and not self.draining
+                )
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            # never drop the socket without an answer; the connection is closed below
+            _log_error("connection handler", e)
+            try:
+                await self._respond(writer, 500, {"error": "internal error"}, keep_alive=False)
+            except Exception:
+                pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Tuple[Optional[Dict[str, str]], Optional[bytes]]:
+        """
+        Headers and body after the request line: (headers, body), (None, None) for a bad
+        Content-Length, (headers, None) for a body over MAX_BODY (left unread).
+        """
+        headers = {}
+        while True:
+            h = await reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = h.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+        raw_length = headers.get("content-length") or "0"
+        if not raw_length.isdigit():  # also rejects negative values
+            return None, None
+        length = int(raw_length)
+        if length > MAX_BODY:
+            return headers, None
+        return headers, (await reader.readexactly(length) if length else b"")
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 429:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+    # ---- lifecycle ----
+    async def start(self, host: str = HOST, port: int = PORT) -> asyncio.AbstractServer:
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.backends.warmup)
+        await self.backends.astart()
+        self._server = await asyncio.start_server(self._handle_conn, host, port)
+        return self._server
+
+    async def shutdown(self, grace_s: float = SHUTDOWN_GRACE_S):
+        """Stop accepting, drain in-flight requests, then release backend handles."""
+        self.draining = True
+        if self._server is not None:
+            self._server.close()
+        try:
+            await asyncio.wait_for(self._idle.wait(), grace_s)
+        except asyncio.TimeoutError:
+            print(f"Shutdown grace period over with {self.inflight + self.waiting} requests pending.")
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        await self.backends.astop()
+        self.backends.close()
+
+
+async def serve(service: AnswerService, host: str = HOST, port: int = PORT):
+    server = await service.start(host, port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    addrs = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"Serving on {addrs} (concurrency={service.max_concurrency}, queue={service.max_queue})")
+    await stop.wait()
+    print("Shutting down: draining in-flight requests...")
+    await service.shutdown()
+    print("Bye.")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    ap.add_argument("--queue", type=int, default=MAX_QUEUE)
+    ap.add_argument("--stub", action="store_true", help="stand-in backends (no Qdrant/Ollama/Neo4j)")
+    ap.add_argument("--stub-delay", type=float, default=0.5)
+    args = ap.parse_args()
+
+    backends = stub_backends(args.stub_delay) if args.stub else real_backends()
+    service = AnswerService(backends, max_concurrency=args.concurrency, max_queue=args.queue)
+    asyncio.run(serve(service, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# app/vector_storage.py
+import os
+from typing import Dict, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization, BinaryQuantizationConfig, CollectionInfo, Distance,
+    PayloadSchemaType, QuantizationSearchParams, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    SearchParams, VectorParams,
+)
+
+# Storage profiles for KB collections (chosen at creation time, STORAGE_PROFILE):
+#   float32  originals in RAM, no quantization (the old default)
+#   int8     scalar-quantized copy in RAM (4x smaller), float32 originals on disk
+#   binary   1-bit copy in RAM (32x smaller), float32 originals on disk
+#   on_disk  float32 originals on disk only (page cache decides what stays hot)
+# Quantized profiles search the compact copy with oversampling, then rescore the
+# top candidates against the originals (see search_params).
+# Quantization and on-disk storage need a Qdrant server (QDRANT_URL); local
+# path mode accepts the config but keeps plain float32 in memory.
+QDRANT_URL = os.getenv("QDRANT_URL")              # e.g. http://localhost:6333; unset = local path mode
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+STORAGE_PROFILE = os.getenv("STORAGE_PROFILE", "float32")
+VECTOR_SIZE = 384                                 # bge-small-en-v1.5
+# Payload fields retrieval filters on; each gets a keyword index so filtered search
+# doesn't scan payloads (server mode only: local mode has no payload indexes).
+INDEXED_FIELDS = ("domain", "brand", "section", "category")
+
+PROFILES: Dict[str, Dict] = {
+    "float32": {"on_disk": False, "quantization": None, "bytes_per_dim": 4.0},
+    "int8": {"on_disk": True, "quantization": "int8", "bytes_per_dim": 1.0, "oversampling": 2.0},
+    "binary": {"on_disk": True, "quantization": "binary", "bytes_per_dim": 1 / 8, "oversampling": 3.0},
+    "on_disk": {"on_disk": True, "quantization": None, "bytes_per_dim": 0.0},
+}
+
+
+def connect(path: str) -> QdrantClient:
+    """Qdrant server when QDRANT_URL is set, otherwise the embedded store at `path`."""
+    if QDRANT_URL:
+        return QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    return QdrantClient(path=path)
+
+
+def _profile(name: Optional[str]) -> Dict:
+    name = name or STORAGE_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"unknown storage profile {name!r}; choose from {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def quantization_config(profile: Optional[str] = None):
+    kind = _profile(profile)["quantization"]
+    if kind == "int8":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if kind == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def create_collection(client: QdrantClient, name: str, profile: Optional[str] = None,
+                      size: int = VECTOR_SIZE) -> None:
+    p = _profile(profile)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=size, distance=Distance.COSINE, on_disk=p["on_disk"]),
+        quantization_config=quantization_config(profile),
+    )
+
+
+def ensure_collection(client: QdrantClient, name: str, profile: Optional[str] = None,
+                      size: int = VECTOR_SIZE) -> None:
+    """
+    Create `name` with the given storage profile unless it already exists (then its
+    storage is left as is); either way make sure the filter fields are indexed.
+    """
+    existing = {c.name for c in client.get_collections().collections}
+    existing |= {a.alias_name for a in client.get_aliases().aliases}  # blue/green KBs (ingestion/aliases.py)
+    if name in existing:
+        print(f"Collection exists: {name}")
+    else:
+        print(f"Creating collection: {name} (profile={profile or STORAGE_PROFILE})")
+        create_collection(client, name, profile, size)
+    if QDRANT_URL:
+        ensure_payload_indexes(client, name)
+
+
+def ensure_payload_indexes(client: QdrantClient, name: str, fields=INDEXED_FIELDS) -> None:
+    """Keyword index per filter field; fields already in the payload schema are skipped."""
+    existing = client.get_collection(name).payload_schema or {}
+    for field in fields:
+        if field not in existing:
+            client.create_payload_index(name, field_name=field, field_schema=PayloadSchemaType.KEYWORD)
+            print(f"Indexed payload field '{field}' on {name}")
+
+
+def profile_of(info: CollectionInfo) -> str:
+    """Best-effort reverse lookup of the profile an existing collection was created with."""
+    q = info.config.quantization_config
+    if isinstance(q, ScalarQuantization):
+        return "int8"
+    if isinstance(q, BinaryQuantization):
+        return "binary"
+    vectors = info.config.params.vectors
+    return "on_disk" if isinstance(vectors, VectorParams) and vectors.on_disk else "float32"
+
+
+def search_params(profile: str, oversampling: Optional[float] = None) -> Optional[SearchParams]:
+    """Oversample on the quantized copy, then rescore with the originals; None for plain profiles."""
+    p = _profile(profile)
+    if not p["quantization"]:
+        return None
+    return SearchParams(quantization=QuantizationSearchParams(
+        ignore=False, rescore=True, oversampling=oversampling or p["oversampling"]))
+
+
+def estimated_vector_ram(profile: str, points: int, size: int = VECTOR_SIZE) -> int:
+    """
+    Bytes of vector data the profile keeps resident in RAM (index graph not included).
+    Local path mode ignores the profile and holds float32 vectors in memory.
+    """
+    bytes_per_dim = _profile(profile)["bytes_per_dim"] if QDRANT_URL else PROFILES["float32"]["bytes_per_dim"]
+    return int(points * size * bytes_per_dim)
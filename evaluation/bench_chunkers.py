@@ -0,0 +1,103 @@
+"""
+Chunker throughput and chunk statistics on long policy documents.
+
+  legacy     the old hand-rolled chunk_text (rfind + re-slicing) from policy_ingest_with_ids
+  langchain  RecursiveCharacterTextSplitter, as policy_to_qdrant_dlt used to do (skipped if missing)
+  chars      ingestion/chunking.py, character budget
+  tokens     ingestion/chunking.py, bge token budget (skipped if the tokenizer can't be loaded)
+
+Documents are built by concatenating data/policies.jsonl texts up to --doc-kb each.
+Chunk lengths are reported in characters, and in bge tokens when the tokenizer is available.
+
+Run from repo root:
+  python -m evaluation.bench_chunkers --docs 50 --doc-kb 200 --size 500 --overlap 50 --token-size 128
+"""
+import argparse
+import time
+from pathlib import Path
+from statistics import mean
+from typing import List
+
+from ingestion.chunking import chunk_text, load_tokenizer
+from ingestion.readers import iter_jsonl
+
+
+def legacy_chunk_text(text: str, max_chars: int = 500, overlap: int = 50) -> List[str]:
+    """Verbatim copy of the chunker that used to live in ingestion/policy_ingest_with_ids.py."""
+    text = " ".join(text.split())
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        dot = text.rfind(". ", start, end)
+        if dot != -1 and dot + 2 - start > max_chars * 0.6:
+            end = dot + 2
+        chunks.append(text[start:end].strip())
+        if end == len(text):
+            break
+        start = max(0, end - overlap)
+    return [c for c in chunks if c]
+
+
+def long_documents(n: int, doc_kb: int) -> List[str]:
+    texts = [r["policy_text"] for r in iter_jsonl(Path("data/policies.jsonl")) if r.get("policy_text")]
+    docs, i = [], 0
+    for _ in range(n):
+        parts, size = [], 0
+        while size < doc_kb * 1024:
+            t = texts[i % len(texts)]
+            parts.append(t)
+            size += len(t) + 2
+            i += 1
+        docs.append("\n\n".join(parts))
+    return docs
+
+
+def run(name, fn, docs, tokenizer):
+    t0 = time.perf_counter()
+    chunks = [c for d in docs for c in fn(d)]
+    dt = time.perf_counter() - t0
+    mb = sum(len(d) for d in docs) / 1e6
+    chars = [len(c) for c in chunks]
+    line = (f"{name:<10} {len(docs) / dt:8.1f} docs/s {mb / dt:7.2f} MB/s  chunks={len(chunks):<7} "
+            f"chars mean={mean(chars):6.0f} min={min(chars):4d} max={max(chars):5d}")
+    if tokenizer is not None:
+        toks = [len(e.ids) for e in tokenizer.encode_batch(chunks, add_special_tokens=False)]
+        line += f"  tokens mean={mean(toks):5.0f} max={max(toks):4d}"
+    print(line)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=50)
+    ap.add_argument("--doc-kb", type=int, default=200, help="approx size of each document")
+    ap.add_argument("--size", type=int, default=500, help="chunk size in characters")
+    ap.add_argument("--overlap", type=int, default=50, help="overlap in characters")
+    ap.add_argument("--token-size", type=int, default=128, help="chunk size in bge tokens")
+    ap.add_argument("--token-overlap", type=int, default=16)
+    args = ap.parse_args()
+
+    docs = long_documents(args.docs, args.doc_kb)
+    print(f"{len(docs)} documents, {sum(map(len, docs)) / 1e6:.1f} MB")
+
+    try:
+        tokenizer = load_tokenizer()
+    except Exception as e:
+        print(f"(bge tokenizer unavailable: {type(e).__name__}: {e}; token stats skipped)")
+        tokenizer = None
+
+    run("legacy", lambda d: legacy_chunk_text(d, args.size, args.overlap), docs, tokenizer)
+    try:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        splitter = RecursiveCharacterTextSplitter(chunk_size=args.size, chunk_overlap=args.overlap)
+        run("langchain", lambda d: splitter.split_text(" ".join(d.split())), docs, tokenizer)
+    except ImportError:
+        print("langchain    (not installed, skipped)")
+    run("chars", lambda d: chunk_text(d, args.size, args.overlap, unit="chars"), docs, tokenizer)
+    if tokenizer is not None:
+        run("tokens", lambda d: chunk_text(d, args.token_size, args.token_overlap, unit="tokens",
+                                           tokenizer=tokenizer), docs, tokenizer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Filtered vs unfiltered vector search latency as a collection grows (default up to 1M points).
+
+At each size the same random query vectors are run:
+  unfiltered       plain ANN search
+  domain           domain="policy"                      (~half the points match)
+  brand+category   brand + category                     (~1% match)
+each filtered case once without payload indexes and once with the keyword
+indexes ensure_collection creates (app/vector_storage.INDEXED_FIELDS).
+
+Vectors are random unit vectors (embedding 1M texts would dominate the run).
+Payload indexes only exist on a Qdrant server, so point QDRANT_URL at one;
+without it the in-memory local mode is used and "indexed" equals "scan".
+
+Run from repo root:
+  QDRANT_URL=http://localhost:6333 python -m evaluation.bench_filtered_search --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+from statistics import median
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from app.rag_mistral import build_filter
+from app.vector_storage import INDEXED_FIELDS, QDRANT_URL, VECTOR_SIZE, create_collection, ensure_payload_indexes
+from evaluation.stats import p95
+
+COLLECTION = "bench_filtered_search"
+BRANDS = [f"Brand{i:02d}" for i in range(20)]
+CATEGORIES = ["Bakery", "Dairy", "Fresh Produce", "Household", "Beverages"]
+SECTIONS = ["Delivery", "Refunds and Returns", "Substitutions", "Promotions", "Store Hours"]
+CASES = {
+    "unfiltered": None,
+    "domain": {"domain": "policy"},
+    "brand+category": {"brand": "Brand07", "category": "Dairy"},
+}
+
+
+def unit_vectors(n: int, rng: np.random.Generator) -> np.ndarray:
+    v = rng.standard_normal((n, VECTOR_SIZE), dtype=np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def grow(client: QdrantClient, start: int, end: int, rng: np.random.Generator, batch: int = 2000):
+    rnd = random.Random(start)
+    for lo in range(start, end, batch):
+        hi = min(lo + batch, end)
+        vecs = unit_vectors(hi - lo, rng)
+        client.upsert(COLLECTION, wait=True, points=[
+            PointStruct(id=i, vector=vec.tolist(), payload={
+                "domain": rnd.choice(["policy", "product"]),
+                "brand": rnd.choice(BRANDS),
+                "category": rnd.choice(CATEGORIES),
+                "section": rnd.choice(SECTIONS),
+            })
+            for i, vec in zip(range(lo, hi), vecs)
+        ])
+
+
+def measure(client: QdrantClient, queries: np.ndarray, filters, k: int):
+    flt = build_filter(filters)
+    lat = []
+    for q in queries:
+        t0 = time.perf_counter()
+        client.search(COLLECTION, query_vector=q.tolist(), query_filter=flt, limit=k)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return median(lat), p95(lat)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    args = ap.parse_args()
+
+    client = QdrantClient(url=QDRANT_URL) if QDRANT_URL else QdrantClient(":memory:")
+    if not QDRANT_URL:
+        print("QDRANT_URL not set: in-memory local mode, payload indexes have no effect")
+    if COLLECTION in {c.name for c in client.get_collections().collections}:
+        client.delete_collection(COLLECTION)
+    create_collection(client, COLLECTION, profile="float32")
+
+    rng = np.random.default_rng(7)
+    queries = unit_vectors(args.queries, rng)
+    print(f"{'points':>9} {'case':<15} {'index':<6} {'p50 ms':>8} {'p95 ms':>8}")
+    size = 0
+    for target in sorted(args.sizes):
+        grow(client, size, target, rng)
+        size = target
+        for name, filters in CASES.items():
+            p50, p = measure(client, queries, filters, args.k)
+            print(f"{size:>9} {name:<15} {'-' if filters is None else 'no':<6} {p50:>8.2f} {p:>8.2f}")
+        ensure_payload_indexes(client, COLLECTION)
+        for name, filters in CASES.items():
+            if filters is not None:
+                p50, p = measure(client, queries, filters, args.k)
+                print(f"{size:>9} {name:<15} {'yes':<6} {p50:>8.2f} {p:>8.2f}")
+        for field in INDEXED_FIELDS:  # next size starts unindexed again
+            client.delete_payload_index(COLLECTION, field)
+
+    client.delete_collection(COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
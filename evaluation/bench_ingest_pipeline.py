@@ -0,0 +1,94 @@
+"""
+Ingestion throughput: old per-record loop vs ingestion/pipeline.py on a synthetic corpus.
+
+  baseline: embedder.embed([text]) per record, upsert every BATCH points (blocking)
+  pipeline: reader thread -> batched fastembed (optional parallel) -> writer thread
+
+Both write into an in-memory Qdrant so disk speed doesn't skew the comparison.
+The baseline is slow, so it runs on a sample (--baseline-n) and is compared by rate.
+
+Run from repo root:
+  python -m evaluation.bench_ingest_pipeline --n 100000 --batch-size 256 --parallel 0
+"""
+import argparse
+import random
+import time
+import uuid
+
+from fastembed import TextEmbedding
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from ingestion.pipeline import run_pipeline
+
+EMBED_MODEL = "BAAI/bge-small-en-v1.5"
+CATEGORIES = ["Bakery", "Dairy", "Fresh Produce", "Household", "Beverages"]
+TOPICS = ["delivery", "refund", "substitution", "promotion", "store hours", "allergens", "pack size"]
+
+
+def synthetic_records(n: int, seed: int = 13):
+    rnd = random.Random(seed)
+    for i in range(n):
+        cat, topic = rnd.choice(CATEGORIES), rnd.choice(TOPICS)
+        yield {
+            "id": f"syn-{i}",
+            "category": cat,
+            "question": f"What is the {topic} policy for {cat.lower()} item #{i}?",
+            "answer": f"For {cat.lower()} products, {topic} rules apply: see store guidance {rnd.randint(1, 999)}.",
+        }
+
+
+def to_text(rec):
+    return f"Q: {rec['question']}\nA: {rec['answer']}"
+
+
+def to_point(rec, vec):
+    return PointStruct(id=str(uuid.uuid5(uuid.NAMESPACE_DNS, rec["id"])), vector=vec.tolist(),
+                       payload={"category": rec["category"], "question": rec["question"]})
+
+
+def fresh_collection(name: str) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    client.create_collection(name, vectors_config=VectorParams(size=384, distance=Distance.COSINE))
+    return client
+
+
+def baseline(n: int, embedder: TextEmbedding, batch: int = 128) -> float:
+    client = fresh_collection("bench")
+    t0 = time.perf_counter()
+    points = []
+    for rec in synthetic_records(n):
+        vec = list(embedder.embed([to_text(rec)]))[0]
+        points.append(to_point(rec, vec))
+        if len(points) >= batch:
+            client.upsert(collection_name="bench", points=points)
+            points = []
+    if points:
+        client.upsert(collection_name="bench", points=points)
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000, help="records for the pipeline run")
+    ap.add_argument("--baseline-n", type=int, default=5_000, help="records for the per-record baseline")
+    ap.add_argument("--batch-size", type=int, default=256)
+    ap.add_argument("--parallel", type=int, default=None, help="fastembed workers (0 = all cores)")
+    args = ap.parse_args()
+
+    embedder = TextEmbedding(model_name=EMBED_MODEL)
+    list(embedder.embed(["warmup"]))
+
+    base_rate = baseline(min(args.baseline_n, args.n), embedder)
+    print(f"baseline (per-record): {base_rate:8.1f} rec/s  "
+          f"(~{args.n / base_rate / 60:.1f} min for {args.n} records)")
+
+    client = fresh_collection("bench")
+    stats = run_pipeline(synthetic_records(args.n), to_text, to_point, client, "bench", embedder,
+                         batch_size=args.batch_size, parallel=args.parallel)
+    print(f"pipeline:              {stats.records_per_s:8.1f} rec/s  ({stats.summary()})")
+    print(f"speedup: {stats.records_per_s / base_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
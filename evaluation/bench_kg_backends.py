@@ -0,0 +1,47 @@
+"""
+KG lookup latency per backend (kg/backend.py): the agent's _kg_facts query on
+Neo4j (network hop + fulltext index) vs the embedded in-process index.
+
+Run from repo root:
+  python -m evaluation.bench_kg_backends --backends embedded neo4j --n 200
+"""
+import argparse
+import time
+from statistics import median
+
+from evaluation.stats import p95
+from kg.backend import BACKENDS, get_kg_backend
+
+QUERIES = [
+    "refund for late bakery delivery on Sunday",
+    "Do you provide free delivery?",
+    "Can I turn off substitutions?",
+    "gluten free bread allergens",
+    "What are your store hours on weekends?",
+]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=["embedded", "neo4j"])
+    ap.add_argument("--n", type=int, default=200, help="lookups per backend")
+    ap.add_argument("--k", type=int, default=2)
+    args = ap.parse_args()
+
+    print(f"{'backend':<9} {'warmup ms':>10} {'p50 us':>9} {'p95 us':>9}")
+    for name in args.backends:
+        backend = get_kg_backend(name)
+        t0 = time.perf_counter()
+        backend.warmup()
+        warm_ms = (time.perf_counter() - t0) * 1000
+        lat = []
+        for i in range(args.n):
+            t0 = time.perf_counter()
+            backend.search(QUERIES[i % len(QUERIES)], limit=args.k)
+            lat.append((time.perf_counter() - t0) * 1e6)
+        print(f"{name:<9} {warm_ms:>10.1f} {median(lat):>9.0f} {p95(lat):>9.0f}")
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
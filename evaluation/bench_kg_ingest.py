@@ -0,0 +1,97 @@
+"""
+KG ingestion throughput: the old one auto-commit `session.run` per record vs batched
+UNWIND transactions (kg/bulk.py) at several batch sizes and writer counts.
+
+Synthetic FAQ rows with the scripts/30_ingest_kg_neo4j.py shape (FAQ + Brand + Topic,
+two relationships each) are written under bench-only labels with the same uniqueness
+constraints; everything is dropped between runs and at the end.
+
+Needs a running Neo4j (docker-compose.neo4j.yml; NEO4J_* env, see kg/config.py).
+
+Run from repo root:
+  python -m evaluation.bench_kg_ingest --n 20000 --batch-sizes 100 1000 5000 --writers 1 4
+"""
+import argparse
+import random
+import time
+
+from kg.bulk import write_rows
+from kg.connection import close, session
+
+BRANDS = [f"Brand{i:02d}" for i in range(20)]
+TOPICS = ["Delivery", "Refunds and Returns", "Substitutions", "Promotions", "Store Hours"]
+LABELS = {"BenchFAQ": "id", "BenchBrand": "name", "BenchTopic": "name"}
+
+BODY = """
+MERGE (b:BenchBrand {name: r.brand})
+MERGE (t:BenchTopic {name: r.topic})
+MERGE (f:BenchFAQ {id: r.id})
+SET f.question = r.q, f.answer = r.a, f.domain = 'policy', f.brand = r.brand
+MERGE (f)-[:OF_BRAND]->(b)
+MERGE (f)-[:IN_TOPIC]->(t)
+"""
+PER_RECORD_CQL = "WITH $r AS r" + BODY
+UNWIND_CQL = "UNWIND $rows AS r" + BODY
+
+
+def make_rows(n: int):
+    rnd = random.Random(7)
+    return [{"id": f"bench-{i}", "brand": rnd.choice(BRANDS), "topic": rnd.choice(TOPICS),
+             "q": f"Synthetic question {i} about {rnd.choice(TOPICS).lower()}?",
+             "a": f"Synthetic answer {i}: orders are refunded within {rnd.randint(2, 9)} working days."}
+            for i in range(n)]
+
+
+def reset(s):
+    for label in LABELS:
+        while s.run(f"MATCH (n:{label}) WITH n LIMIT 10000 DETACH DELETE n RETURN count(*) AS c").single()["c"]:
+            pass
+
+
+def per_record(rows):
+    with session() as s:
+        for r in rows:
+            s.run(PER_RECORD_CQL, r=r).consume()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20_000, help="FAQ rows per run")
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    ap.add_argument("--writers", type=int, nargs="+", default=[1, 4])
+    ap.add_argument("--skip-per-record", action="store_true", help="the old path is slow at large --n")
+    args = ap.parse_args()
+
+    rows = make_rows(args.n)
+    with session() as s:
+        for label, key in LABELS.items():
+            s.run(f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.{key} IS UNIQUE").consume()
+
+    runs = [] if args.skip_per_record else [("per-record", lambda: per_record(rows))]
+    for workers in args.writers:
+        for bs in args.batch_sizes:
+            runs.append((f"unwind b={bs} w={workers}",
+                         lambda bs=bs, workers=workers: write_rows(UNWIND_CQL, rows, bs, workers)))
+
+    print(f"{'mode':<22} {'rows':>7} {'seconds':>8} {'nodes/s':>9}")
+    try:
+        for name, fn in runs:
+            with session() as s:
+                reset(s)
+            t0 = time.perf_counter()
+            fn()
+            dt = time.perf_counter() - t0
+            print(f"{name:<22} {len(rows):>7} {dt:>8.2f} {len(rows) / dt:>9.0f}")
+    finally:
+        with session() as s:
+            reset(s)
+            names = [c["name"] for c in s.run("SHOW CONSTRAINTS YIELD name, labelsOrTypes "
+                                              "WHERE any(l IN labelsOrTypes WHERE l IN $labels) RETURN name",
+                                              labels=list(LABELS))]
+            for name in names:
+                s.run(f"DROP CONSTRAINT {name}").consume()
+        close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+KG keyword search latency as the graph grows: the old per-word CONTAINS scan vs the
+fulltext index used by kg/search.py.
+
+Synthetic FAQ nodes (:BenchKG) are built by recombining sentences from the real FAQ
+files, so term frequencies look like the real KB. Both queries are restricted to the
+:BenchKG label and its own index (benchKgText); the old query ran over every node
+of every label, so on a shared database it was slower than measured here.
+Bench nodes and the index are dropped at the end.
+
+Needs a running Neo4j (docker-compose.neo4j.yml; NEO4J_* env, see kg/config.py).
+
+Run from repo root:
+  python -m evaluation.bench_kg_search --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+from statistics import median
+
+from evaluation.stats import p95
+from ingestion.readers import iter_jsonl
+from kg.connection import close, session
+from kg.search import KG_ANALYZER, SEARCH_CQL, lucene_query, normalize_terms
+
+LABEL = "BenchKG"
+INDEX = "benchKgText"
+QUERIES = [
+    "refund for late bakery delivery on Sunday",
+    "Do you provide free delivery?",
+    "Can I turn off substitutions?",
+    "gluten free bread allergens",
+    "store hours on public holidays",
+]
+
+SCAN_CQL = f"""
+MATCH (n:{LABEL})
+WHERE any(w IN split(toLower($q), " ")
+  WHERE (toLower(coalesce(n.question,"")) CONTAINS w OR toLower(coalesce(n.answer,"")) CONTAINS w))
+RETURN labels(n) AS labels, n.id AS id, n.question AS question, n.answer AS answer
+LIMIT $lim
+"""
+
+
+def source_sentences():
+    questions, answers = [], []
+    for path in ("data/policy_faqs.jsonl", "data/product_faqs.jsonl"):
+        for rec in iter_jsonl(path, required=("question", "answer")):
+            questions.append(rec["question"])
+            answers.append(rec["answer"])
+    return questions, answers
+
+
+def grow(s, start: int, end: int, questions, answers, batch: int = 5000):
+    rnd = random.Random(start)
+    for lo in range(start, end, batch):
+        rows = [{"id": f"bench-{i}",
+                 "question": rnd.choice(questions),
+                 "answer": " ".join(rnd.sample(answers, 2))}
+                for i in range(lo, min(lo + batch, end))]
+        s.run(f"UNWIND $rows AS r CREATE (n:{LABEL}) SET n = r", rows=rows).consume()
+
+
+def measure(s, fn, queries, reps: int):
+    lat = []
+    for _ in range(reps):
+        for q in queries:
+            t0 = time.perf_counter()
+            fn(s, q)
+            lat.append((time.perf_counter() - t0) * 1000)
+    return median(lat), p95(lat)
+
+
+def scan(s, q, k=10):
+    return list(s.run(SCAN_CQL, q=q, lim=k))
+
+
+def fulltext(s, q, k=10):
+    terms = normalize_terms(q)
+    return list(s.run(SEARCH_CQL, index=INDEX, q=lucene_query(terms), lim=k)) if terms else []
+
+
+def cleanup(s):
+    s.run(f"DROP INDEX {INDEX} IF EXISTS").consume()
+    while s.run(f"MATCH (n:{LABEL}) WITH n LIMIT 10000 DETACH DELETE n RETURN count(*) AS c").single()["c"]:
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--reps", type=int, default=10, help="passes over the query set per size")
+    args = ap.parse_args()
+
+    questions, answers = source_sentences()
+    with session() as s:
+        cleanup(s)
+        s.run(f"CREATE FULLTEXT INDEX {INDEX} FOR (n:{LABEL}) ON EACH [n.question, n.answer] "
+              f"OPTIONS {{indexConfig: {{`fulltext.analyzer`: '{KG_ANALYZER}'}}}}").consume()
+        s.run("CALL db.awaitIndex($name, 300)", name=INDEX).consume()
+
+        print(f"{'nodes':>8} {'method':<9} {'p50 ms':>8} {'p95 ms':>8}")
+        size = 0
+        try:
+            for target in sorted(args.sizes):
+                grow(s, size, target, questions, answers)
+                size = target
+                for name, fn in (("contains", scan), ("fulltext", fulltext)):
+                    fn(s, QUERIES[0])  # warm plan cache
+                    p50, p = measure(s, fn, QUERIES, args.reps)
+                    print(f"{size:>8} {name:<9} {p50:>8.2f} {p:>8.2f}")
+        finally:
+            cleanup(s)
+    close()
+
+
+if __name__ == "__main__":
+    main()
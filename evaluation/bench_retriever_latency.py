@@ -0,0 +1,78 @@
+"""
+Before/after latency for retrieval:
+  - cold: build QdrantClient + TextEmbedding on every call (old app/rag_mistral.retrieve)
+  - warm: one shared Retriever, loaded + warmed once
+
+Run from repo root:  python -m evaluation.bench_retriever_latency --n 20
+"""
+import argparse
+import time
+from statistics import mean, median
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+from fastembed import TextEmbedding
+
+from app.rag_mistral import Retriever, QDRANT_PATH, COLLECTION, EMBED_MODEL
+from evaluation.stats import p95
+
+QUERIES = [
+    "What happens if I am not at home during delivery?",
+    "How do I get a refund for missing groceries?",
+    "Do you provide free delivery?",
+    "Can I turn off substitutions?",
+    "What are your store hours on weekends?",
+]
+
+
+def report(name, lat_ms):
+    print(f"{name:<6} n={len(lat_ms):<4} mean={mean(lat_ms):8.1f} ms  "
+          f"p50={median(lat_ms):8.1f} ms  p95={p95(lat_ms):8.1f} ms")
+
+
+def cold_retrieve(query: str, k: int):
+    """Exactly what the old per-call retrieve() did."""
+    client = QdrantClient(path=QDRANT_PATH)
+    embedder = TextEmbedding(model_name=EMBED_MODEL)
+    vec = list(embedder.embed([query]))[0]
+    flt = Filter(must=[FieldCondition(key="domain", match=MatchValue(value="policy"))])
+    hits = client.search(collection_name=COLLECTION, query_vector=vec, limit=k,
+                         query_filter=flt, with_payload=True)
+    client.close()  # release the local storage lock before the next call
+    return hits
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20, help="queries per mode")
+    ap.add_argument("--k", type=int, default=3)
+    args = ap.parse_args()
+
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.n)]
+
+    cold = []
+    for q in queries:
+        t0 = time.perf_counter()
+        cold_retrieve(q, args.k)
+        cold.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    retriever = Retriever().warmup()
+    startup_ms = (time.perf_counter() - t0) * 1000
+
+    warm = []
+    for q in queries:
+        t0 = time.perf_counter()
+        retriever.retrieve(q, k=args.k)
+        warm.append((time.perf_counter() - t0) * 1000)
+    retriever.close()
+
+    print("\n--- Retrieval latency (per question) ---")
+    report("cold", cold)
+    report("warm", warm)
+    print(f"warm one-off startup (load + warmup): {startup_ms:.1f} ms")
+    print(f"speedup (mean): {mean(cold) / max(mean(warm), 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
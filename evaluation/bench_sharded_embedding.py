@@ -0,0 +1,59 @@
+"""
+Catalog-scale ingestion: ingestion/sharded.py at 1, 2, 4 ... worker processes.
+
+Writes a synthetic product JSONL to a temp file, then embeds it with run_sharded
+(byte-range shards, one single-threaded fastembed per process) into an in-memory
+Qdrant, and reports rec/s and the speedup over one worker.
+
+Run from repo root:
+  python -m evaluation.bench_sharded_embedding --n 200000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from evaluation.bench_ingest_pipeline import EMBED_MODEL, synthetic_records
+from ingestion.product_kb_to_qdrant import to_record
+from ingestion.sharded import run_sharded
+
+
+def write_corpus(n: int, path: Path) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for rec in synthetic_records(n):
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def main():
+    cores = os.cpu_count() or 1
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000, help="synthetic product records")
+    ap.add_argument("--workers", type=int, nargs="+",
+                    default=sorted({w for w in (1, 2, 4, cores) if w <= cores}))
+    ap.add_argument("--batch-size", type=int, default=256)
+    ap.add_argument("--shard-mb", type=float, default=4.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "products.jsonl"
+        write_corpus(args.n, path)
+        print(f"{args.n} records, {path.stat().st_size / 1e6:.1f} MB, {cores} cores")
+
+        base = None
+        for workers in args.workers:
+            client = QdrantClient(":memory:")
+            client.create_collection("bench", vectors_config=VectorParams(size=384, distance=Distance.COSINE))
+            stats = run_sharded(path, to_record, client, "bench", model=EMBED_MODEL, workers=workers,
+                                batch_size=args.batch_size, shard_bytes=int(args.shard_mb * 1024 * 1024),
+                                use_store=False)  # every run must embed, and keep bench text out of the store
+            base = base or stats.records_per_s
+            print(f"workers={workers:<3} {stats.records_per_s:8.1f} rec/s  "
+                  f"speedup {stats.records_per_s / base:4.1f}x  ({stats.summary()})")
+
+
+if __name__ == "__main__":
+    main()
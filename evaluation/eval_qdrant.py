@@ -1,16 +1,21 @@
-import json
 import argparse
+import time
+from itertools import islice
 from pathlib import Path
 from statistics import mean
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
-from fastembed import TextEmbedding
+from qdrant_client.models import Filter, FieldCondition, MatchValue, PointStruct
+
+from app.rag_mistral import get_retriever
+from app.vector_storage import PROFILES, QDRANT_URL, create_collection, estimated_vector_ram
+from evaluation.stats import p95
+from ingestion.readers import iter_jsonl
 
 # -------- config --------
-QDRANT_PATH = "db.qdrant"
 COLLECTION = "kb_policy_policy_chunks"
+EVAL_FILE = Path("evaluation/eval_queries.jsonl")  # each line has query + gold_parent_id or gold_title
 K = 5
+QUERY_BATCH = 256  # queries per embed pass / Qdrant batch search
 USE_HYBRID_RERANK = True  # set False to disable lexical tie-breaker
 
 def lexical_overlap_score(query: str, text: str) -> int:
@@ -18,32 +23,46 @@ def lexical_overlap_score(query: str, text: str) -> int:
     ts = set((text or "").lower().split())
     return len(qs & ts)
 
-def main():
-    eval_file = Path("evaluation/eval_queries.jsonl")  # each line has query + gold_parent_id or gold_title
-    rows = [json.loads(l) for l in eval_file.read_text(encoding="utf-8").splitlines()]
-
-    client = QdrantClient(path=QDRANT_PATH)
-    embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-
-    hits_all, rr_all = [], []
-
-    for rec in rows:
+def evaluate(retriever, collection: str, verbose: bool = True, timed: bool = False) -> dict:
+    """
+    Hit@K / MRR over EVAL_FILE, one batch search per QUERY_BATCH queries.
+    timed=True searches query by query instead to report p95 search latency (embedding excluded).
+    """
+    rows = iter_jsonl(EVAL_FILE, required=("query",))  # streamed, QUERY_BATCH at a time
+
+    hits_all, rr_all, lat_ms = [], [], []
+    flt = Filter(must=[FieldCondition(key="domain", match=MatchValue(value="policy"))])
+    fetch_k = max(K, 20)  # fetch a bit more then prune/dedup
+
+    def scored():
+        while True:
+            chunk = list(islice(rows, QUERY_BATCH))
+            if not chunk:
+                return
+            queries = [rec["query"] for rec in chunk]
+            if not timed:
+                yield from zip(chunk, retriever.search_many(queries, k=fetch_k, collection=collection,
+                                                            query_filter=flt))
+                continue
+            # one embed pass per chunk of queries, then one timed ANN search per query
+            vecs = retriever.embed_many(queries)
+            for rec, vec in zip(chunk, vecs):
+                t0 = time.perf_counter()
+                hits = retriever.search(
+                    rec["query"],
+                    k=fetch_k,
+                    collection=collection,
+                    query_filter=flt,
+                    vector=vec,
+                )
+                lat_ms.append((time.perf_counter() - t0) * 1000)
+                yield rec, hits
+
+    for rec, hits in scored():
         query = rec["query"]
         gold_pid = rec.get("gold_parent_id")
         gold_title = rec.get("gold_title")  # fallback if no parent id provided
 
-        vec = list(embedder.embed([query]))[0]
-        flt = Filter(must=[FieldCondition(key="domain", match=MatchValue(value="policy"))])
-
-        # ANN step
-        hits = client.search(
-            collection_name=COLLECTION,
-            query_vector=vec,
-            limit=max(K, 20),     # fetch a bit more then prune/dedup
-            query_filter=flt,
-            with_payload=True,
-        )
-
         # Optional: hybrid rerank by lexical overlap (cheap tie-breaker)
         if USE_HYBRID_RERANK:
             rescored = []
@@ -68,8 +87,9 @@ def main():
         titles = [ (h.payload or {}).get("policy_title") for h in hits ]
         pids   = [ (h.payload or {}).get("parent_id")    for h in hits ]
 
-        print(f"\nQuery: {query}")
-        print("Retrieved (titles):", titles)
+        if verbose:
+            print(f"\nQuery: {query}")
+            print("Retrieved (titles):", titles)
 
         # Decide match key
         if gold_pid:
@@ -85,14 +105,60 @@ def main():
         try:
             rank = key_list.index(gold_key) + 1
             rr_all.append(1.0 / rank)
-            print(f"✅ Found gold at rank {rank}")
+            if verbose:
+                print(f"✅ Found gold at rank {rank}")
         except ValueError:
             rr_all.append(0.0)
-            print("❌ Gold not found")
+            if verbose:
+                print("❌ Gold not found")
+
+    return {
+        "hit": mean(hits_all) if hits_all else 0.0,
+        "mrr": mean(rr_all) if rr_all else 0.0,
+        "p95_ms": p95(lat_ms) if timed else None,
+    }
+
+def clone_with_profile(client, src: str, dst: str, profile: str) -> int:
+    """Copy every point of `src` (vectors + payloads) into a fresh `dst` created with `profile`."""
+    if dst in {c.name for c in client.get_collections().collections}:
+        client.delete_collection(dst)
+    create_collection(client, dst, profile)
+    copied, offset = 0, None
+    while True:
+        points, offset = client.scroll(src, limit=1000, offset=offset, with_payload=True, with_vectors=True)
+        if points:
+            client.upsert(dst, points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points])
+            copied += len(points)
+        if offset is None:
+            return copied
 
-    print("\n--- Retrieval Evaluation ---")
-    print(f"Hit@{K}: {mean(hits_all):.2f}")
-    print(f"MRR:   {mean(rr_all):.2f}")
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--profiles", nargs="*", choices=list(PROFILES),
+                    help="compare storage profiles on copies of the collection (see app/vector_storage.py)")
+    args = ap.parse_args()
+    if args.profiles and not QDRANT_URL:
+        # local path mode stores every profile as plain float32: identical recall/latency, no RAM saving
+        ap.error("--profiles needs a Qdrant server (set QDRANT_URL); local mode does not apply storage profiles")
+
+    retriever = get_retriever(warmup=True)  # shared client + embedder (run: python -m evaluation.eval_qdrant)
+
+    if not args.profiles:
+        res = evaluate(retriever, COLLECTION)
+        print("\n--- Retrieval Evaluation ---")
+        print(f"Hit@{K}: {res['hit']:.2f}")
+        print(f"MRR:   {res['mrr']:.2f}")
+        return
+
+    print(f"\n--- Storage profiles on '{COLLECTION}' ---")
+    print(f"{'profile':<9} {'Hit@' + str(K):>6} {'MRR':>6} {'p95 ms':>8} {'est. vector RAM':>16}")
+    for profile in args.profiles:
+        target = f"{COLLECTION}__{profile}"
+        points = clone_with_profile(retriever.client, COLLECTION, target, profile)
+        res = evaluate(retriever, target, verbose=False, timed=True)
+        ram_mb = estimated_vector_ram(profile, points) / 1e6
+        print(f"{profile:<9} {res['hit']:>6.2f} {res['mrr']:>6.2f} {res['p95_ms']:>8.1f} {ram_mb:>13.1f} MB")
+        retriever.client.delete_collection(target)
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,3 @@
-import json
 import csv
 import re
 from pathlib import Path
@@ -10,7 +9,8 @@ from rouge import Rouge
 
 # Import your RAG pipeline (retrieval + prompt + LLM)
 # Run from repo root:  python -m evaluation.eval_rag_outputs
-from app.rag_mistral import rag_answer
+from app.rag_mistral import rag_answer, get_retriever
+from ingestion.readers import iter_jsonl
 
 EVAL_FILE = Path("evaluation/eval_qna.jsonl")
 OUT_CSV   = Path("evaluation/rag_outputs.csv")
@@ -85,11 +85,9 @@ def main():
             '{"query":"...","gold_answer":"..."}'
         )
 
-    rows = [json.loads(l) for l in EVAL_FILE.read_text(encoding="utf-8").splitlines()]
-    if not rows:
-        print("No eval rows found.")
-        return
+    rows = iter_jsonl(EVAL_FILE)  # streamed; only the scored results are kept
 
+    get_retriever(warmup=True)  # load once; every rag_answer below reuses it
     results: List[Dict[str, Any]] = []
 
     for i, rec in enumerate(rows, start=1):
@@ -120,6 +118,10 @@ def main():
             "rougeL_f": round(rgs["rougeL_f"], 3),
         })
 
+    if not results:
+        print("No eval rows found.")
+        return
+
     # Summary
     cos_mean = float(np.mean([r["cosine_tfidf"] for r in results])) if results else 0.0
     r1_mean  = float(np.mean([r["rouge1_f"]     for r in results])) if results else 0.0
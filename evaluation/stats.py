@@ -0,0 +1,10 @@
+# evaluation/stats.py
+from typing import Sequence
+
+
+def p95(xs: Sequence[float]) -> float:
+    """Nearest-rank 95th percentile (0.0 for no samples); shared by the eval/bench scripts."""
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(0.95 * (len(xs) - 1))))]
@@ -0,0 +1,105 @@
+# ingestion/aliases.py
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+
+from app.kb_versions import bump_version
+from app.vector_storage import create_collection, ensure_payload_indexes, QDRANT_URL
+from ingestion.manifest import SyncPlan, save_manifest
+
+# Blue/green rebuilds: a full rebuild writes <alias>_v<n>, checks the point count,
+# then repoints the alias (the name retrieval uses) in one atomic alias update.
+# Readers never see a missing or half-filled collection; old versions are kept
+# for rollback up to KEEP_VERSIONS and then dropped.
+# Needs a Qdrant server (QDRANT_URL): in local path mode the running app holds the
+# storage lock and its own in-memory copy, so it could never see the alias switch.
+KEEP_VERSIONS = int(os.getenv("KEEP_VERSIONS", "2"))   # live version included
+
+
+def aliases(client: QdrantClient) -> Dict[str, str]:
+    """{alias: collection} for every alias."""
+    return {a.alias_name: a.collection_name for a in client.get_aliases().aliases}
+
+
+def versions(client: QdrantClient, alias: str) -> List[int]:
+    pat = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    found = (pat.match(c.name) for c in client.get_collections().collections)
+    return sorted(int(m.group(1)) for m in found if m)
+
+
+def next_version_name(client: QdrantClient, alias: str) -> str:
+    return f"{alias}_v{max(versions(client, alias), default=0) + 1}"
+
+
+def switch_alias(client: QdrantClient, alias: str, target: str) -> Optional[str]:
+    """Point `alias` at `target` atomically; returns the collection it pointed at before."""
+    previous = aliases(client).get(alias)
+    ops = []
+    if previous is not None:
+        ops.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    elif alias in {c.name for c in client.get_collections().collections}:
+        # one-time migration from the old plain collection of the same name;
+        # the name is unavailable between this delete and the alias update below
+        print(f"Migrating plain collection '{alias}' to an alias")
+        client.delete_collection(alias)
+    ops.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=ops)
+    return previous
+
+
+def gc_versions(client: QdrantClient, alias: str, keep: int = KEEP_VERSIONS) -> List[str]:
+    """Drop all but the newest `keep` versions; the live target is never dropped."""
+    live = aliases(client).get(alias)
+    names = [f"{alias}_v{n}" for n in versions(client, alias)]
+    stale = [name for name in names[:-keep] if name != live] if keep > 0 else []
+    for name in stale:
+        client.delete_collection(name)
+        print(f"Dropped old version: {name}")
+    return stale
+
+
+def blue_green_rebuild(client: QdrantClient, alias: str, build: Callable[[str], int],
+                       profile: Optional[str] = None, keep: int = KEEP_VERSIONS) -> str:
+    """
+    build(target) fills the fresh collection and returns how many points it wrote.
+    The alias only moves if the collection holds exactly that many; otherwise the
+    new version is dropped and the old one keeps serving.
+    """
+    if not QDRANT_URL:
+        raise RuntimeError("blue/green rebuilds need a Qdrant server (set QDRANT_URL); "
+                           "in local path mode run a plain sync with the app stopped")
+    target = next_version_name(client, alias)
+    print(f"Building {target} (alias '{alias}' keeps serving the current version)")
+    create_collection(client, target, profile)
+    ensure_payload_indexes(client, target)
+    try:
+        expected = build(target)
+        count = client.count(target, exact=True).count
+        if count != expected:
+            raise RuntimeError(f"{target} holds {count} points, expected {expected}; alias not switched")
+    except BaseException:
+        client.delete_collection(target)
+        raise
+    previous = switch_alias(client, alias, target)
+    print(f"Alias '{alias}' -> {target} (was {previous or 'none'})")
+    gc_versions(client, alias, keep)
+    bump_version(alias)  # runtime caches/search params keyed on the alias refresh
+    return target
+
+
+def rebuild_kb(client: QdrantClient, alias: str, current: Dict[str, str],
+               fill: Callable[[str], None], profile: Optional[str] = None) -> str:
+    """
+    blue_green_rebuild for loaders that track this run's {point_id: hash}; also writes the
+    manifest. `fill` may add to `current` while it runs; it is read once fill returns.
+    """
+    def build(target: str) -> int:
+        fill(target)
+        return len(current)
+
+    target = blue_green_rebuild(client, alias, build, profile)
+    save_manifest(SyncPlan(collection=alias, current=current))
+    return target
@@ -0,0 +1,108 @@
+# ingestion/chunking.py
+import os
+import re
+import uuid
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# One chunker for every loader. Text is scanned once for sentence boundaries; chunks
+# are then cut with binary searches over those offsets (work per chunk, not per
+# sentence) and strings are only sliced when a chunk is emitted. Budgets are in
+# characters or in bge tokens (CHUNK_UNIT), the latter from one tokenizer pass.
+CHUNK_UNIT = os.getenv("CHUNK_UNIT", "chars")                # "chars" | "tokens"
+TOKENIZER_MODEL = os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+
+Span = Tuple[int, int]
+
+_BOUNDARY = re.compile(r"[.!?\n]\s+")        # sentence end or line break, plus the gap after it
+_LAST_WS = re.compile(r"\s(?=\S*$)")
+
+
+def sentence_starts(text: str) -> List[int]:
+    """Offsets where sentences/lines start, plus len(text) as the final sentinel (one regex pass)."""
+    first = len(text) - len(text.lstrip())
+    return [first] + [m.end() for m in _BOUNDARY.finditer(text, first)] + [len(text)]
+
+
+@lru_cache(maxsize=2)
+def load_tokenizer(model: str = TOKENIZER_MODEL):
+    """The embedding model's own tokenizer, so token budgets match what bge sees."""
+    from tokenizers import Tokenizer
+    tok = Tokenizer.from_pretrained(model)
+    tok.no_truncation()   # bge's tokenizer.json truncates at 512; we need the full document
+    tok.no_padding()
+    return tok
+
+
+def chunk_spans(text: str, max_len: int = 500, overlap: int = 50, unit: Optional[str] = None,
+                tokenizer=None) -> List[Span]:
+    """
+    Greedy sentence packing: each chunk ends on the last sentence boundary that keeps
+    it within `max_len` (chars or tokens) and the next one starts at the first
+    boundary inside the trailing `overlap`. A sentence longer than the budget is cut
+    at whitespace (chars) or at a token boundary (tokens). Returns offsets into `text`.
+    """
+    unit = unit or CHUNK_UNIT
+    if unit not in ("chars", "tokens"):
+        raise ValueError(f"unknown chunk unit {unit!r} (use 'chars' or 'tokens')")
+    bounds = sentence_starts(text)
+    n = bounds[-1]
+    if unit == "tokens":
+        tok = tokenizer or load_tokenizer()
+        tstarts = [off[0] for off in tok.encode(text, add_special_tokens=False).offsets]
+
+        def limit(s: int) -> int:            # furthest end offset within the budget
+            i = bisect_left(tstarts, s) + max_len
+            return tstarts[i] if i < len(tstarts) else n
+
+        def back(e: int) -> int:             # where the overlap window starts
+            return tstarts[max(bisect_left(tstarts, e) - overlap, 0)]
+    else:
+        def limit(s: int) -> int:
+            return min(s + max_len, n)
+
+        def back(e: int) -> int:
+            return e - overlap
+
+    spans: List[Span] = []
+    s = bounds[0]
+    while s < n:
+        lim = limit(s)
+        e = bounds[bisect_right(bounds, lim) - 1]
+        if e <= s:                           # sentence alone exceeds the budget
+            e = lim
+            if unit == "chars" and lim < n:
+                m = _LAST_WS.search(text, s, lim)
+                if m and m.start() > s:
+                    e = m.start()
+        spans.append((s, e))                 # s sits on a non-space char, so never empty
+        if e >= n:
+            break
+        nxt = bounds[bisect_left(bounds, back(e))]
+        s = nxt if s < nxt < e else e
+        while s < n and text[s].isspace():
+            s += 1
+    return spans
+
+
+def chunk_text(text: str, max_len: int = 500, overlap: int = 50, unit: Optional[str] = None,
+               tokenizer=None) -> List[str]:
+    """chunk_spans() materialized, with whitespace collapsed inside each chunk."""
+    return [" ".join(text[s:e].split()) for s, e in chunk_spans(text, max_len, overlap, unit, tokenizer)]
+
+
+# Point ids for chunks of data/policies.jsonl. Both loaders of kb_policy_policy_chunks
+# (policy_ingest_with_ids, policy_to_qdrant_dlt) use them, so they share one manifest
+# without leaving duplicate or orphaned points when run one after the other.
+POLICY_ID_NAMESPACE = uuid.UUID("00000000-0000-0000-0000-000000000000")  # UUIDv5 namespace (constant)
+
+
+def policy_chunk_ids(brand: str, title: str, idx: int) -> Tuple[str, str, str]:
+    """
+    (parent_id, chunk_id, point_id) for chunk `idx` (1-based) of a policy:
+    parent_id is a UUIDv5 of "brand::title", chunk_id "<parent_id>-<idx>", point_id
+    a UUIDv5 of idx under parent_id (Qdrant needs UUID/int point ids).
+    """
+    parent_id = str(uuid.uuid5(POLICY_ID_NAMESPACE, f"{brand}::{title}"))
+    return parent_id, f"{parent_id}-{idx}", str(uuid.uuid5(uuid.UUID(parent_id), str(idx)))
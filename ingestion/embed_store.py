@@ -0,0 +1,31 @@
+# ingestion/embed_store.py
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.embed_cache import DiskVectorStore
+
+# Content-addressed document vectors shared by every loader and collection:
+#   <EMBED_STORE_DIR>/<model>/  (DiskVectorStore: memmapped float32 + index.tsv)
+# keyed by sha256(text), so rebuilds, chunking experiments and migrations to a new
+# collection only embed text the model has never seen. EMBED_STORE_DIR="" disables it.
+EMBED_STORE_DIR = os.getenv("EMBED_STORE_DIR", "embed_store")
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def store_path(model: str) -> Optional[Path]:
+    if not EMBED_STORE_DIR:
+        return None
+    return Path(EMBED_STORE_DIR) / model.replace("/", "__")
+
+
+def open_embed_store(model: str, readonly: bool = False) -> Optional[DiskVectorStore]:
+    """The store for `model`, or None when disabled (or, read-only, when nothing was stored yet)."""
+    path = store_path(model)
+    if path is None or (readonly and not path.exists()):
+        return None
+    return DiskVectorStore(str(path), model, readonly=readonly)
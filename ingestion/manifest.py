@@ -0,0 +1,122 @@
+# ingestion/manifest.py
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointIdsList
+
+# One JSON manifest per collection: {point_id: content_hash} of what is currently upserted
+MANIFEST_DIR = Path(os.getenv("INGEST_MANIFEST_DIR", "ingest_manifests"))
+
+_UNSET = object()
+
+
+def content_hash(text: str, payload: Dict[str, Any], model: str) -> str:
+    """Changes whenever the embedded text, the stored payload or the embedding model changes."""
+    blob = json.dumps({"model": model, "text": text, "payload": payload},
+                      sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SyncPlan:
+    collection: str
+    current: Dict[str, str]                 # point_id -> hash for this run's source rows
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def to_upsert(self) -> set:
+        return set(self.added) | set(self.updated)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.deleted)
+
+    def summary(self) -> str:
+        return (f"'{self.collection}': added={len(self.added)} updated={len(self.updated)} "
+                f"deleted={len(self.deleted)} unchanged={self.unchanged}")
+
+
+def manifest_path(collection: str) -> Path:
+    return MANIFEST_DIR / f"{collection}.json"
+
+
+def load_manifest(collection: str) -> Dict[str, str]:
+    try:
+        return json.loads(manifest_path(collection).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _live_ids(client: QdrantClient, collection: str) -> List[str]:
+    ids, offset = [], None
+    while True:
+        points, offset = client.scroll(collection, limit=1000, offset=offset,
+                                       with_payload=False, with_vectors=False)
+        ids += [str(p.id) for p in points]
+        if offset is None:
+            return ids
+
+
+def trusted_manifest(client: QdrantClient, collection: str) -> Optional[Dict[str, str]]:
+    """
+    Manifest of the last successful run, or None if it can't be trusted because it
+    disagrees with the live point count (collection dropped, manifest lost, run died).
+    """
+    previous = load_manifest(collection)
+    live = client.count(collection, exact=True).count
+    if live == len(previous):
+        return previous
+    if previous:
+        print(f"Manifest for '{collection}' out of sync ({len(previous)} vs {live} live points); full re-ingest.")
+    return None
+
+
+def plan_sync(client: QdrantClient, collection: str, current: Dict[str, str],
+              previous: Any = _UNSET) -> SyncPlan:
+    """
+    Diff this run's {point_id: hash} against the manifest of the last successful run
+    (pass `previous` if it was already loaded via trusted_manifest). With no trusted
+    manifest everything is treated as new.
+    """
+    if previous is _UNSET:
+        previous = trusted_manifest(client, collection)
+    stale: List[str] = []
+    if previous is None:
+        # fall back to the live ids so points whose source rows vanished still get deleted
+        stale = [pid for pid in _live_ids(client, collection) if pid not in current]
+        previous = {}
+
+    plan = SyncPlan(collection=collection, current=current)
+    for pid, h in current.items():
+        old = previous.get(pid)
+        if old is None:
+            plan.added.append(pid)
+        elif old != h:
+            plan.updated.append(pid)
+        else:
+            plan.unchanged += 1
+    plan.deleted = [pid for pid in previous if pid not in current] + stale
+    return plan
+
+
+def delete_stale(client: QdrantClient, plan: SyncPlan) -> None:
+    if plan.deleted:
+        client.delete(collection_name=plan.collection,
+                      points_selector=PointIdsList(points=plan.deleted))
+
+
+def save_manifest(plan: SyncPlan) -> None:
+    """Write only after upserts/deletes succeeded, so a crash leads to a re-check, not data loss."""
+    path = manifest_path(plan.collection)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(plan.current, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,186 @@
+# ingestion/pipeline.py
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from fastembed import TextEmbedding
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from app.embed_cache import DiskVectorStore
+from ingestion.embed_store import text_key
+
+# Shared knobs for every loader (env overrides)
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "256"))  # texts per ONNX call
+EMBED_PARALLEL = os.getenv("EMBED_PARALLEL")                      # fastembed workers; "0" = all cores
+UPSERT_BATCH = int(os.getenv("UPSERT_BATCH", "512"))              # points per Qdrant upsert
+QUEUE_DEPTH = 4                                                    # batches buffered between stages
+
+_DONE = object()
+
+
+@dataclass
+class PipelineStats:
+    records: int = 0
+    reused: int = 0           # vectors taken from the embed store instead of the model
+    batches: int = 0
+    elapsed_s: float = 0.0
+    read_s: float = 0.0       # waiting on the reader (parse, chunk, embed-store lookups)
+    embed_s: float = 0.0      # in the embedder (the rest of the main loop)
+    upsert_s: float = 0.0     # in client.upsert on the writer thread (overlaps the above)
+    batch_size: int = 0
+    upsert_batch: int = 0
+
+    @property
+    def records_per_s(self) -> float:
+        return self.records / self.elapsed_s if self.elapsed_s else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.records} records in {self.elapsed_s:.2f}s "
+                f"({self.records_per_s:.1f} rec/s, {self.reused} reused, {self.batches} upserts, "
+                f"{self.upsert_s:.2f}s in upsert)")
+
+
+def prefetch(items: Iterable, maxsize: int = 1024) -> Iterator:
+    """Iterate `items` on a background thread (reading/parsing overlaps with embedding)."""
+    q: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    errors: List[BaseException] = []
+
+    def reader():
+        try:
+            for item in items:
+                q.put(item)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            q.put(_DONE)
+
+    threading.Thread(target=reader, name="ingest-reader", daemon=True).start()
+    while True:
+        item = q.get()
+        if item is _DONE:
+            break
+        yield item
+    if errors:
+        raise errors[0]
+
+
+def parallel_arg() -> Optional[int]:
+    return int(EMBED_PARALLEL) if EMBED_PARALLEL not in (None, "") else None
+
+
+def run_pipeline(
+    records: Iterable[Any],
+    to_text: Callable[[Any], str],
+    to_point: Callable[[Any, Any], PointStruct],
+    client: QdrantClient,
+    collection: str,
+    embedder: TextEmbedding,
+    batch_size: int = INGEST_EMBED_BATCH,
+    parallel: Optional[int] = None,
+    upsert_batch: int = UPSERT_BATCH,
+    store: Optional[DiskVectorStore] = None,
+) -> PipelineStats:
+    """
+    reader thread -> batched embedding (this thread) -> writer thread (upserts).
+    All records go through ONE embedder.embed() call over a lazy text stream, so
+    fastembed batches (and, with `parallel`, fans out to worker processes) on its own
+    while the writer upserts finished batches in the background.
+    With a `store` (see ingestion/embed_store.py), texts already embedded by this model
+    skip the embedder and go straight to the writer; new vectors are added to it.
+    """
+    stats = PipelineStats(batch_size=batch_size, upsert_batch=upsert_batch)
+    t0 = time.perf_counter()
+    put_wait = 0.0  # main thread blocked on a full writer queue (counted as upsert, not embed)
+    out_q: "queue.Queue" = queue.Queue(maxsize=QUEUE_DEPTH)
+    writer_errors: List[BaseException] = []
+
+    def writer():
+        while True:
+            points = out_q.get()
+            if points is _DONE:
+                return
+            if writer_errors:
+                continue  # keep draining so the producer never blocks
+            try:
+                t = time.perf_counter()
+                client.upsert(collection_name=collection, points=points)
+                stats.upsert_s += time.perf_counter() - t
+                stats.batches += 1
+            except BaseException as e:
+                writer_errors.append(e)
+
+    w = threading.Thread(target=writer, name="ingest-writer", daemon=True)
+    w.start()
+
+    pending: deque = deque()  # (record, text key) whose vectors haven't come back yet (embed keeps order)
+
+    def timed_records() -> Iterator:
+        it = prefetch(records)
+        while True:
+            t = time.perf_counter()
+            rec = next(it, _DONE)
+            stats.read_s += time.perf_counter() - t
+            if rec is _DONE:
+                return
+            yield rec
+
+    def texts() -> Iterator[str]:
+        reused: List[PointStruct] = []
+        for rec in timed_records():
+            t = time.perf_counter()
+            text = to_text(rec)
+            key = text_key(text) if store is not None else None
+            vec = store.get_many([key])[0] if key is not None else None
+            stats.read_s += time.perf_counter() - t
+            if vec is not None:
+                reused.append(to_point(rec, vec))
+                stats.records += 1
+                stats.reused += 1
+                if len(reused) >= upsert_batch:
+                    out_q.put(reused)
+                    reused = []
+                continue
+            pending.append((rec, key))
+            yield text
+        if reused:
+            out_q.put(reused)
+
+    try:
+        buf: List[PointStruct] = []
+        new_keys: List[str] = []
+        new_vecs: List = []
+        for vec in embedder.embed(texts(), batch_size=batch_size, parallel=parallel):
+            rec, key = pending.popleft()
+            buf.append(to_point(rec, vec))
+            if store is not None:
+                new_keys.append(key)
+                new_vecs.append(vec)
+            stats.records += 1
+            if len(buf) >= upsert_batch:
+                t = time.perf_counter()
+                out_q.put(buf)
+                put_wait += time.perf_counter() - t
+                buf = []
+                if store is not None:
+                    store.put_many(new_keys, new_vecs)
+                    new_keys, new_vecs = [], []
+                if writer_errors:
+                    break
+        if buf:
+            out_q.put(buf)
+        if new_keys:
+            store.put_many(new_keys, new_vecs)
+    finally:
+        out_q.put(_DONE)
+        w.join()
+    if writer_errors:
+        raise writer_errors[0]
+
+    stats.elapsed_s = time.perf_counter() - t0
+    stats.embed_s = max(stats.elapsed_s - stats.read_s - put_wait, 0.0)
+    return stats
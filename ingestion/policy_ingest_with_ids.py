@@ -1,68 +1,50 @@
-import json
-import uuid
+import argparse
+import time
 from pathlib import Path
-from typing import Iterator, Dict, Any, List
+from typing import Iterator, Dict, Any, Optional
 
 from fastembed import TextEmbedding
-from qdrant_client import QdrantClient
 from qdrant_client.http import models as rest
 
+from app.kb_versions import bump_version
+from app.vector_storage import connect, ensure_collection
+from ingestion.aliases import rebuild_kb
+from ingestion.chunking import chunk_text, policy_chunk_ids
+from ingestion.embed_store import open_embed_store
+from ingestion.manifest import content_hash, plan_sync, delete_stale, save_manifest
+from ingestion.pipeline import run_pipeline, parallel_arg, INGEST_EMBED_BATCH
+from ingestion.readers import iter_records
+from ingestion.report import RunReport
 
-# -----------------------------
-# Stable IDs & simple chunking
-# -----------------------------
-NAMESPACE = uuid.UUID("00000000-0000-0000-0000-000000000000")  # UUIDv5 namespace (constant)
-
-def stable_uuid(name: str) -> str:
-    """Deterministic UUIDv5 from a stable string (e.g., brand + title)."""
-    return str(uuid.uuid5(NAMESPACE, name))
-
-def chunk_text(text: str, max_chars: int = 500, overlap: int = 50) -> List[str]:
-    """Lightweight char-based chunker with small overlap."""
-    text = " ".join(text.split())
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = min(start + max_chars, len(text))
-        # extend to end of sentence if possible (rough)
-        dot = text.rfind(". ", start, end)
-        if dot != -1 and dot + 2 - start > max_chars * 0.6:
-            end = dot + 2
-        chunks.append(text[start:end].strip())
-        if end == len(text):
-            break
-        start = max(0, end - overlap)
-    # drop empties
-    return [c for c in chunks if c]
 
 # -----------------------------
 # Load raw policies & yield chunks with IDs
 # -----------------------------
-def iter_policy_chunks(src_path: Path) -> Iterator[Dict[str, Any]]:
+def iter_policy_chunks(src_path: Path, report: Optional[RunReport] = None) -> Iterator[Dict[str, Any]]:
     """
     Yields chunk records with:
       - parent_id: stable per-policy UUID (document-level id)
       - chunk_id:  parent_id + "-<n>" (string, human-friendly)
       - point_id:  UUID for Qdrant point id (required: UUID/int)
+    Chunking time is charged to report's "chunk" stage when a report is given.
     """
-    raw = [json.loads(l) for l in src_path.read_text(encoding="utf-8").splitlines()]
-    for rec in raw:
+    for rec in iter_records(src_path, required=("brand", "policy_title", "policy_text")):
         brand = rec["brand"]
         title = rec["policy_title"]
         url = rec.get("source_url")
         full = rec["policy_text"]
         domain = rec.get("domain", "policy")
 
-        # stable document-level id (like 'id' in the homework)
-        parent_id = stable_uuid(f"{brand}::{title}")
-
-        chunks = chunk_text(full, max_chars=500, overlap=50)
+        t0 = time.perf_counter()
+        chunks = chunk_text(full, max_len=500, overlap=50)
+        if report is not None:
+            report.add("chunk", time.perf_counter() - t0, len(chunks))
         for idx, ch in enumerate(chunks, start=1):
-            chunk_id = f"{parent_id}-{idx}"               # human-friendly
-            point_id = uuid.uuid5(uuid.UUID(parent_id), str(idx))  # UUID required by Qdrant local
+            # stable ids shared with policy_to_qdrant_dlt (ingestion/chunking.py)
+            parent_id, chunk_id, point_id = policy_chunk_ids(brand, title, idx)
 
             yield {
-                "point_id": str(point_id),     # used as Qdrant point id
+                "point_id": point_id,          # used as Qdrant point id
                 "parent_id": parent_id,        # document-level id (homework-style)
                 "chunk_id": chunk_id,          # chunk-level id (string)
                 "brand": brand,
@@ -80,65 +62,97 @@ def main():
     DB_PATH = "db.qdrant"
     COLLECTION = "kb_policy_policy_chunks"
 
-    client = QdrantClient(path=DB_PATH)
-
-    # (Re)create collection with UNNAMED dense vector (size 384, cosine)
-    # This mirrors your homework style and avoids named-vector complications.
-    client.recreate_collection(
-        collection_name=COLLECTION,
-        vectors_config=rest.VectorParams(size=384, distance=rest.Distance.COSINE),
-    )
-
-    embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+    EMBED_MODEL = "BAAI/bge-small-en-v1.5"
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rebuild", action="store_true",
+                    help="full blue/green rebuild into a new version instead of an in-place sync")
+    args = ap.parse_args()
+
+    client = connect(DB_PATH)
+
+    def to_payload(r: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "parent_id": r["parent_id"],
+            "chunk_id": r["chunk_id"],
+            "brand": r["brand"],
+            "policy_title": r["policy_title"],
+            "source_url": r["source_url"],
+            "text": r["text"],
+            "domain": r["domain"],
+        }
+
+    report = RunReport("policy_ingest_with_ids", collection=COLLECTION, input=str(DATA), rebuild=args.rebuild)
+
+    def fill(collection: str, only=None) -> None:
+        # reader -> batched fastembed -> background upserts (see ingestion/pipeline.py)
+        stats = run_pipeline(
+            (r for r in iter_policy_chunks(DATA) if only is None or r["point_id"] in only),
+            to_text=lambda r: r["text"],
+            to_point=lambda r, v: rest.PointStruct(
+                id=r["point_id"],          # UUID string accepted by local Qdrant
+                vector=v.tolist(),         # UNNAMED dense vector
+                payload=to_payload(r),
+            ),
+            client=client,
+            collection=collection,
+            embedder=TextEmbedding(model_name=EMBED_MODEL),
+            batch_size=INGEST_EMBED_BATCH,
+            parallel=parallel_arg(),
+            upsert_batch=64,
+            store=open_embed_store(EMBED_MODEL),  # vectors for already-seen text are reused
+        )
+        print(f"Upserted {stats.summary()}")
+        report.add_pipeline(stats)
+
+    with report:
+        # Hash pass keeps only {point_id: hash}; the embed pass re-streams the source
+        current = {
+            r["point_id"]: content_hash(r["text"], to_payload(r), EMBED_MODEL)
+            for r in report.timed("read+chunk+hash", iter_policy_chunks(DATA, report))
+        }
+
+        if args.rebuild:
+            # Blue/green: build COLLECTION_v<n> next to the live one, then switch the alias
+            # retrieval reads through (ingestion/aliases.py); no downtime, no half-filled KB.
+            with report.stage("rebuild", records=len(current)):  # embed/upsert stages are inside
+                rebuild_kb(client, COLLECTION, current, fill)
+            print(f"{client.count(COLLECTION, exact=True).count} chunks in '{COLLECTION}'.")
+            return
 
-    # Batch upsert for efficiency
-    BATCH = 64
-    buffer = []
+        # Create the collection once with UNNAMED dense vector (size 384, cosine) and keep it;
+        # re-runs only touch chunks whose content changed (see ingestion/manifest.py).
+        # This mirrors your homework style and avoids named-vector complications.
+        # STORAGE_PROFILE picks float32 / int8 / binary / on_disk storage (app/vector_storage.py).
+        ensure_collection(client, COLLECTION)
+        with report.stage("plan", records=len(current)):
+            plan = plan_sync(client, COLLECTION, current)
+        if plan.to_upsert:
+            fill(COLLECTION, only=plan.to_upsert)
+
+        with report.stage("delete", records=len(plan.deleted)):
+            delete_stale(client, plan)
+        with report.stage("manifest", records=len(current)):
+            save_manifest(plan)
+        print(f"Sync {plan.summary()}")
+        report.meta["sync"] = plan.summary()
+
+        # Quick report
+        cnt = client.count(COLLECTION, exact=True).count
+        print(f"{cnt} chunks in '{COLLECTION}' (unnamed vector, 384-d, cosine).")
+        if plan.changed:
+            bump_version(COLLECTION)  # drops cached answers built on the old KB
+        # Show one sample with IDs
+        hits = client.scroll(COLLECTION, limit=1, with_payload=True)[0]
+        if hits:
+            p = hits[0]
+            print("Sample payload:", {
+                "parent_id": p.payload.get("parent_id"),
+                "chunk_id": p.payload.get("chunk_id"),
+                "policy_title": p.payload.get("policy_title"),
+                "brand": p.payload.get("brand"),
+            })
 
-    def flush(batch: List[Dict[str, Any]]):
-        if not batch:
-            return
-        texts = [r["text"] for r in batch]
-        vecs = list(embedder.embed(texts))  # produces List[List[float]]
-        points = []
-        for r, v in zip(batch, vecs):
-            points.append(
-                rest.PointStruct(
-                    id=r["point_id"],          # UUID string accepted by local Qdrant
-                    vector=v,                  # UNNAMED dense vector
-                    payload={
-                        "parent_id": r["parent_id"],
-                        "chunk_id": r["chunk_id"],
-                        "brand": r["brand"],
-                        "policy_title": r["policy_title"],
-                        "source_url": r["source_url"],
-                        "text": r["text"],
-                        "domain": r["domain"],
-                    },
-                )
-            )
-        client.upsert(collection_name=COLLECTION, points=points)
-
-    for rec in iter_policy_chunks(DATA):
-        buffer.append(rec)
-        if len(buffer) >= BATCH:
-            flush(buffer)
-            buffer = []
-    flush(buffer)
-
-    # Quick report
-    cnt = client.count(COLLECTION, exact=True).count
-    print(f"Upserted {cnt} chunks into '{COLLECTION}' (unnamed vector, 384-d, cosine).")
-    # Show one sample with IDs
-    hits = client.scroll(COLLECTION, limit=1, with_payload=True)[0]
-    if hits:
-        p = hits[0]
-        print("Sample payload:", {
-            "parent_id": p.payload.get("parent_id"),
-            "chunk_id": p.payload.get("chunk_id"),
-            "policy_title": p.payload.get("policy_title"),
-            "brand": p.payload.get("brand"),
-        })
 
 if __name__ == "__main__":
     main()
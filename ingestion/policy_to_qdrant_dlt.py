@@ -1,46 +1,49 @@
-import json
+import argparse
+import time
 from pathlib import Path
-from typing import Iterator, Dict, Any
-from uuid import uuid5, NAMESPACE_URL
+from typing import Iterator, Dict, Any, Optional
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from qdrant_client.models import PointStruct
 from fastembed import TextEmbedding
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from app.kb_versions import bump_version
+from app.vector_storage import connect, ensure_collection
+from ingestion.aliases import rebuild_kb
+from ingestion.chunking import CHUNK_UNIT, chunk_text, policy_chunk_ids
+from ingestion.embed_store import open_embed_store
+from ingestion.manifest import content_hash, plan_sync, delete_stale, save_manifest
+from ingestion.pipeline import run_pipeline, parallel_arg, INGEST_EMBED_BATCH
+from ingestion.readers import iter_records
+from ingestion.report import RunReport
 
-# ---- LangChain chunker (state-of-practice) ----
-# You can tweak these two numbers and re-run evaluation (Hit@k/MRR)
+
+# ---- sentence-aware chunker (ingestion/chunking.py) ----
+# You can tweak these two numbers (and CHUNK_UNIT=chars|tokens) and re-run evaluation (Hit@k/MRR)
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
 
-splitter = RecursiveCharacterTextSplitter(
-    chunk_size=CHUNK_SIZE,
-    chunk_overlap=CHUNK_OVERLAP,
-    # The default separator hierarchy already prefers paragraph/sentence breaks.
-    # You can pass `separators=[...]` if your data has special structure.
-)
-
-def chunk_text(text: str) -> list[str]:
-    """Return sentence/paragraph-aware chunks with overlap."""
-    # Normalize whitespace lightly; Recursive splitter is tolerant anyway.
-    text = " ".join(text.split())
-    return splitter.split_text(text)
-
 
 # ---- data iterator: yields chunked policy records ----
-def iter_policy_chunks() -> Iterator[Dict[str, Any]]:
+def iter_policy_chunks(report: Optional[RunReport] = None) -> Iterator[Dict[str, Any]]:
     src = Path("data/policies.jsonl")
-    for i, line in enumerate(src.read_text(encoding="utf-8").splitlines(), start=1):
-        rec = json.loads(line)
+    records = iter_records(src, required=("brand", "policy_title", "policy_text", "source_url"))
+    for rec in records:
         title = rec["policy_title"]
         full = rec["policy_text"]
         brand = rec["brand"]
         url = rec["source_url"]
 
-        for j, ch in enumerate(chunk_text(full), start=1):
+        t0 = time.perf_counter()
+        chunks = chunk_text(full, CHUNK_SIZE, CHUNK_OVERLAP)
+        if report is not None:
+            report.add("chunk", time.perf_counter() - t0, len(chunks))
+        for j, ch in enumerate(chunks, start=1):
+            # same ids as policy_ingest_with_ids, so both keep one manifest in sync
+            parent_id, chunk_id, point_id = policy_chunk_ids(brand, title, j)
             yield {
-                "id": f"{i}-{j}",            # local composite id (we'll convert to UUID)
+                "point_id": point_id,
+                "parent_id": parent_id,
+                "chunk_id": chunk_id,
                 "brand": brand,
                 "source_url": url,
                 "policy_title": title,
@@ -51,39 +54,83 @@ def iter_policy_chunks() -> Iterator[Dict[str, Any]]:
 
 def main():
     collection = "kb_policy_policy_chunks"
-    client = QdrantClient(path="db.qdrant")
-
-    # Clean & recreate collection with UNNAMED/default vector slot (homework-style)
-    existing = [c.name for c in client.get_collections().collections]
-    if collection in existing:
-        client.delete_collection(collection)
-    client.create_collection(
-        collection_name=collection,
-        vectors_config=VectorParams(size=384, distance=Distance.COSINE),
-    )
-
-    # One fixed model (same as retrieval)
-    embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-
-    points = []
-    for rec in iter_policy_chunks():
-        vec = list(embedder.embed([rec["text"]]))[0].tolist()
+    embed_model = "BAAI/bge-small-en-v1.5"   # one fixed model (same as retrieval)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rebuild", action="store_true",
+                    help="full blue/green rebuild into a new version instead of an in-place sync")
+    args = ap.parse_args()
+
+    client = connect("db.qdrant")
+
+    def to_row(rec: Dict[str, Any]):
+        # same payload as policy_ingest_with_ids, so unchanged chunks hash the same
         payload = {
+            "parent_id": rec["parent_id"],
+            "chunk_id": rec["chunk_id"],
             "brand": rec["brand"],
-            "source_url": rec["source_url"],
             "policy_title": rec["policy_title"],
+            "source_url": rec["source_url"],
             "text": rec["text"],
             "domain": rec["domain"],
         }
-        # Deterministic UUID from composite id (stable across runs)
-        pid = uuid5(NAMESPACE_URL, f"{collection}:{rec['id']}")
-        points.append(PointStruct(id=str(pid), vector=vec, payload=payload))
-
-    client.upsert(collection_name=collection, points=points)
-    print(
-        f"Upserted {len(points)} vectors into '{collection}' "
-        f"(default unnamed vector; chunk_size={CHUNK_SIZE}, overlap={CHUNK_OVERLAP})."
-    )
+        return rec["point_id"], rec["text"], payload
+
+    upserted = 0
+    report = RunReport("policy_to_qdrant_dlt", collection=collection, rebuild=args.rebuild,
+                       chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, chunk_unit=CHUNK_UNIT)
+
+    def fill(target: str, only=None) -> None:
+        nonlocal upserted
+        stats = run_pipeline(
+            (r for r in map(to_row, iter_policy_chunks()) if only is None or r[0] in only),
+            to_text=lambda r: r[1],
+            to_point=lambda r, vec: PointStruct(id=r[0], vector=vec.tolist(), payload=r[2]),
+            client=client,
+            collection=target,
+            embedder=TextEmbedding(model_name=embed_model),
+            batch_size=INGEST_EMBED_BATCH,
+            parallel=parallel_arg(),
+            store=open_embed_store(embed_model),  # vectors for already-seen text are reused
+        )
+        upserted = stats.records
+        print(f"Pipeline: {stats.summary()}")
+        report.add_pipeline(stats)
+
+    with report:
+        # Hash pass keeps only {point_id: hash}; the embed pass re-streams the source
+        current = {
+            pid: content_hash(text, payload, embed_model) for pid, text, payload in
+            report.timed("read+chunk+hash", map(to_row, iter_policy_chunks(report)))
+        }
+
+        if args.rebuild:
+            # Blue/green: fill collection_v<n>, check it, then switch the alias (ingestion/aliases.py)
+            with report.stage("rebuild", records=len(current)):  # embed/upsert stages are inside
+                rebuild_kb(client, collection, current, fill)
+            print(f"Rebuilt '{collection}' with {upserted} vectors "
+                  f"(chunk_size={CHUNK_SIZE} {CHUNK_UNIT}, overlap={CHUNK_OVERLAP}).")
+            return
+
+        # Create once with UNNAMED/default vector slot (homework-style); re-runs sync in place.
+        # STORAGE_PROFILE picks float32 / int8 / binary / on_disk storage (app/vector_storage.py).
+        ensure_collection(client, collection)
+        with report.stage("plan", records=len(current)):
+            plan = plan_sync(client, collection, current)
+        if plan.to_upsert:
+            fill(collection, only=plan.to_upsert)
+
+        with report.stage("delete", records=len(plan.deleted)):
+            delete_stale(client, plan)
+        with report.stage("manifest", records=len(current)):
+            save_manifest(plan)
+        print(
+            f"Upserted {upserted} vectors into '{collection}' "
+            f"(default unnamed vector; chunk_size={CHUNK_SIZE} {CHUNK_UNIT}, overlap={CHUNK_OVERLAP})."
+        )
+        print(f"Sync {plan.summary()}")
+        report.meta["sync"] = plan.summary()
+        if plan.changed:
+            bump_version(collection)  # drops cached answers built on the old KB
 
 
 if __name__ == "__main__":
@@ -1,16 +1,27 @@
-import json
+import argparse
 import uuid
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Optional, Tuple
 
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import PointStruct
 from fastembed import TextEmbedding
 
+from app.kb_versions import bump_version
+from app.vector_storage import connect, ensure_collection
+from ingestion.aliases import rebuild_kb
+from ingestion.embed_store import open_embed_store
+from ingestion.manifest import content_hash, plan_sync, trusted_manifest, delete_stale, save_manifest
+from ingestion.pipeline import run_pipeline, parallel_arg, INGEST_EMBED_BATCH
+from ingestion.readers import iter_records
+from ingestion.report import RunReport
+from ingestion.sharded import run_sharded
+
 
 # ------------ CONFIG ------------
 QDRANT_PATH = "db.qdrant"
-INPUT = Path("data/product_faqs.jsonl")      # 100 records generated by your script
+INPUT = Path("data/product_faqs.jsonl")      # 100 records generated by your script (or the .csv export)
+REQUIRED = ("id", "question", "answer")
 COLLECTION = "kb_product_faqs"
 BATCH = 128
 EMBED_MODEL = "BAAI/bge-small-en-v1.5"       # 384-dim
@@ -21,63 +32,133 @@ def stable_uuid_from_id(stable_id: str) -> uuid.UUID:
     return uuid.uuid5(uuid.NAMESPACE_DNS, f"product:{stable_id}")
 
 
-def read_jsonl(path: Path) -> List[Dict]:
-    return [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines() if l.strip()]
-
-
-def ensure_collection(client: QdrantClient, name: str):
-    try:
-        client.get_collection(name)
-        print(f"Collection exists: {name}")
-    except Exception:
-        print(f"Creating collection: {name}")
-        client.create_collection(
-            collection_name=name,
-            vectors_config=VectorParams(size=384, distance=Distance.COSINE),
-        )
+def to_record(rec: Dict) -> Tuple[str, str, Dict]:
+    """(point id, text to embed, payload) for one product FAQ row."""
+    # Concatenate question + answer for richer signal
+    text = f"Q: {rec['question'].strip()}\nA: {rec['answer'].strip()}"
+    pid = str(stable_uuid_from_id(rec["id"]))
+    payload = {
+        "id": rec["id"],
+        "brand": rec.get("brand", "SupermarketCo"),
+        "category": rec.get("category"),
+        "question": rec["question"],
+        "answer": rec["answer"],
+        "domain": rec.get("domain", "product"),
+        "source": "product_faqs.jsonl",
+    }
+    return pid, text, payload
+
+
+def read_records(path: Path):
+    return (to_record(rec) for rec in iter_records(path, required=REQUIRED))
+
+
+def upsert_rows(client: QdrantClient, collection: str, path: Path, only=None,
+                report: Optional[RunReport] = None) -> None:
+    """Embed + upsert the rows of `path` (all of them, or those whose point id is in `only`)."""
+    # reader -> batched fastembed -> background upserts (see ingestion/pipeline.py)
+    stats = run_pipeline(
+        (r for r in read_records(path) if only is None or r[0] in only),
+        to_text=lambda r: r[1],
+        to_point=lambda r, vec: PointStruct(id=r[0], vector=vec.tolist(), payload=r[2]),
+        client=client,
+        collection=collection,
+        embedder=TextEmbedding(model_name=EMBED_MODEL),
+        batch_size=INGEST_EMBED_BATCH,
+        parallel=parallel_arg(),
+        upsert_batch=BATCH,
+        store=open_embed_store(EMBED_MODEL),  # vectors for already-seen text are reused
+    )
+    print(f"Upserted {stats.summary()}")
+    if report is not None:
+        report.add_pipeline(stats)
+
+
+def upsert_sharded(client: QdrantClient, collection: str, path: Path, workers: int,
+                   previous: Optional[Dict[str, str]] = None,
+                   report: Optional[RunReport] = None) -> Dict[str, str]:
+    """Catalog-scale path: byte-range shards embedded on a process pool, single writer here."""
+    stats = run_sharded(path, to_record, client, collection, model=EMBED_MODEL,
+                        workers=workers, batch_size=INGEST_EMBED_BATCH, upsert_batch=BATCH,
+                        previous=previous or {}, required=REQUIRED)
+    print(f"Upserted {stats.summary()}")
+    if report is not None:
+        report.add_sharded(stats)
+    return stats.seen
+
+
+def rebuild(client: QdrantClient, path: Path, workers: Optional[int], report: RunReport) -> None:
+    """Blue/green: fill a fresh COLLECTION_v<n>, then move the alias (see ingestion/aliases.py)."""
+    current: Dict[str, str] = {}  # filled while building: the sharded path learns hashes as it embeds
+
+    def fill(target: str) -> None:
+        if workers is not None:
+            current.update(upsert_sharded(client, target, path, workers, report=report))
+        else:
+            current.update({pid: content_hash(text, payload, EMBED_MODEL)
+                            for pid, text, payload in report.timed("read+hash", read_records(path))})
+            upsert_rows(client, target, path, report=report)
+
+    with report.stage("rebuild"):  # embed/upsert stages are inside
+        rebuild_kb(client, COLLECTION, current, fill)
 
 
 def main():
-    assert INPUT.exists(), f"Input file not found: {INPUT}"
-    data = read_jsonl(INPUT)
-    print(f"Loaded {len(data)} records from {INPUT}")
-
-    client = QdrantClient(path=QDRANT_PATH)
-    ensure_collection(client, COLLECTION)
-
-    embedder = TextEmbedding(model_name=EMBED_MODEL)
-
-    points: List[PointStruct] = []
-    for rec in data:
-        # Concatenate question + answer for richer signal
-        text = f"Q: {rec['question'].strip()}\nA: {rec['answer'].strip()}"
-        vec = list(embedder.embed([text]))[0]
-
-        pid = stable_uuid_from_id(rec["id"])
-        payload = {
-            "id": rec["id"],
-            "brand": rec.get("brand", "SupermarketCo"),
-            "category": rec.get("category"),
-            "question": rec["question"],
-            "answer": rec["answer"],
-            "domain": rec.get("domain", "product"),
-            "source": "product_faqs.jsonl",
-        }
-        points.append(PointStruct(id=str(pid), vector=vec, payload=payload))
-
-        if len(points) >= BATCH:
-            client.upsert(collection_name=COLLECTION, points=points)
-            print(f"Upserted {len(points)} points...")
-            points = []
-
-    if points:
-        client.upsert(collection_name=COLLECTION, points=points)
-        print(f"Upserted {len(points)} points...")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=None,
+                    help="embed on N worker processes (0 = all cores); default: in-process pipeline")
+    ap.add_argument("--input", type=Path, default=INPUT, help="product FAQ export (.jsonl or .csv)")
+    ap.add_argument("--rebuild", action="store_true",
+                    help="full blue/green rebuild into a new version instead of an in-place sync")
+    args = ap.parse_args()
+
+    assert args.input.exists(), f"Input file not found: {args.input}"
+    client = connect(QDRANT_PATH)
+
+    with RunReport("product_kb_to_qdrant", collection=COLLECTION, input=str(args.input),
+                   rebuild=args.rebuild, workers=args.workers) as report:
+        if args.rebuild:
+            rebuild(client, args.input, args.workers, report)
+            print(f"Done. Total points in '{COLLECTION}': {client.count(COLLECTION, exact=True).count}")
+            return
+
+        ensure_collection(client, COLLECTION)
+
+        if args.workers is not None:
+            previous = trusted_manifest(client, COLLECTION)
+            seen = upsert_sharded(client, COLLECTION, args.input, args.workers, previous, report=report)
+            with report.stage("plan", records=len(seen)):
+                plan = plan_sync(client, COLLECTION, seen, previous=previous)
+            finish(client, plan, report)
+            return
+
+        # Pass 1 keeps only {point_id: hash}; pass 2 re-streams the file for the rows to embed,
+        # so no copy of the corpus is held in memory
+        current = {pid: content_hash(text, payload, EMBED_MODEL)
+                   for pid, text, payload in report.timed("read+hash", read_records(args.input))}
+        print(f"Read {len(current)} records from {args.input}")
+        with report.stage("plan", records=len(current)):
+            plan = plan_sync(client, COLLECTION, current)
+
+        if plan.to_upsert:
+            upsert_rows(client, COLLECTION, args.input, only=plan.to_upsert, report=report)
+
+        finish(client, plan, report)
+
+
+def finish(client: QdrantClient, plan, report: RunReport):
+    with report.stage("delete", records=len(plan.deleted)):
+        delete_stale(client, plan)
+    with report.stage("manifest", records=len(plan.current)):
+        save_manifest(plan)
+    print(f"Sync {plan.summary()}")
+    report.meta["sync"] = plan.summary()
 
     # Quick count
     count = client.count(COLLECTION, exact=True).count
     print(f"Done. Total points in '{COLLECTION}': {count}")
-
+    if plan.changed:
+        bump_version(COLLECTION)  # drops cached answers built on the old KB
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,101 @@
+# ingestion/readers.py
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# Every KB source goes through here: records are yielded one at a time, so memory
+# stays flat however large the export is. Bad lines are reported as file:line and
+# skipped (or raised with strict=True) instead of killing a multi-GB load halfway.
+
+
+class MalformedRecord(ValueError):
+    def __init__(self, where: str, reason: str):
+        super().__init__(f"{where}: {reason}")
+        self.where = where
+        self.reason = reason
+
+
+def _bad(where: str, reason: str, strict: bool) -> None:
+    if strict:
+        raise MalformedRecord(where, reason)
+    print(f"[WARN] {where}: {reason}, skipped", file=sys.stderr)
+
+
+def _missing(rec: Dict[str, Any], required: Iterable[str]) -> Optional[str]:
+    gone = [k for k in required if rec.get(k) in (None, "")]
+    return f"missing {', '.join(gone)}" if gone else None
+
+
+def _parse_json_line(raw: bytes, where: str, required: Iterable[str], strict: bool) -> Optional[Dict[str, Any]]:
+    if not raw.strip():
+        return None
+    try:
+        rec = json.loads(raw)
+    except ValueError as e:
+        _bad(where, f"not valid JSON ({e.msg})", strict)
+        return None
+    if not isinstance(rec, dict):
+        _bad(where, "not a JSON object", strict)
+        return None
+    problem = _missing(rec, required)
+    if problem:
+        _bad(where, problem, strict)
+        return None
+    return rec
+
+
+def iter_jsonl(path: Path, required: Iterable[str] = (), strict: bool = False) -> Iterator[Dict[str, Any]]:
+    """One dict per non-empty line; malformed lines are reported with their line number."""
+    with Path(path).open("rb") as f:
+        for lineno, raw in enumerate(f, start=1):
+            rec = _parse_json_line(raw, f"{path}:{lineno}", required, strict)
+            if rec is not None:
+                yield rec
+
+
+def iter_jsonl_range(path: Path, start: int, end: int, required: Iterable[str] = (),
+                     strict: bool = False) -> Iterator[Dict[str, Any]]:
+    """Records of the lines that start inside the byte range [start, end)."""
+    with Path(path).open("rb") as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            rec = _parse_json_line(raw, f"{path}@byte {pos}", required, strict)
+            pos += len(raw)
+            if rec is not None:
+                yield rec
+
+
+def iter_csv(path: Path, required: Iterable[str] = (), strict: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    One dict per CSV row (header = keys). Empty cells are left out, as if the key were
+    missing from a JSONL record, so rec.get(key, default) behaves the same for both.
+    """
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            where = f"{path}:{reader.line_num}"
+            if None in row:                       # more cells than header columns
+                _bad(where, f"{len(row[None])} extra field(s)", strict)
+                continue
+            if not any(row.values()):
+                continue
+            rec = {k: v for k, v in row.items() if v not in ("", None)}   # None: short row
+            problem = _missing(rec, required)
+            if problem:
+                _bad(where, problem, strict)
+                continue
+            yield rec
+
+
+def iter_records(path: Path, required: Iterable[str] = (), strict: bool = False) -> Iterator[Dict[str, Any]]:
+    """Stream a .jsonl or .csv KB export (picked by suffix)."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        return iter_csv(path, required, strict)
+    return iter_jsonl(path, required, strict)
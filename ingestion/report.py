@@ -0,0 +1,135 @@
+# ingestion/report.py
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# One JSON report per ingestion run: wall time, records/s and batch sizes per stage,
+# plus peak RSS, so slow refreshes can be traced to a stage and compared over time.
+#   <INGEST_REPORT_DIR>/<entry>-<UTC timestamp>.json     (INGEST_REPORT_DIR="" disables)
+REPORT_DIR = os.getenv("INGEST_REPORT_DIR", "ingest_reports")
+
+
+def peak_rss_mb() -> Dict[str, Optional[float]]:
+    """Peak resident set size of this process and of its (reaped) children, in MB."""
+    if resource is None:
+        return {"self": None, "children": None}
+    scale = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024  # bytes on macOS, KB on Linux
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale, 1),
+    }
+
+
+class RunReport:
+    """
+    Collects per-stage timings for one ingestion run; use as a context manager so
+    the report is written even when the run fails.
+
+        with RunReport("policy_kb_to_qdrant", collection=COLLECTION) as report:
+            with report.stage("hash", records=n): ...
+            report.add_pipeline(stats)
+    """
+
+    def __init__(self, entry: str, **meta: Any):
+        self.entry = entry
+        self.meta = meta
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.started = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self.path: Optional[Path] = None
+
+    def add(self, name: str, seconds: float = 0.0, records: int = 0, batches: int = 0,
+            batch_size: Optional[int] = None) -> None:
+        """Accumulate into stage `name` (may be called many times per stage)."""
+        st = self.stages.setdefault(name, {"wall_s": 0.0, "records": 0, "batches": 0, "batch_size": None})
+        st["wall_s"] += seconds
+        st["records"] += records
+        st["batches"] += batches
+        if batch_size is not None:
+            st["batch_size"] = batch_size
+
+    @contextmanager
+    def stage(self, name: str, records: int = 0, batches: int = 0, batch_size: Optional[int] = None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0, records, batches, batch_size)
+
+    def timed(self, name: str, items: Iterable) -> Iterator:
+        """Pass-through iterator that charges the time spent producing each item to `name`."""
+        it = iter(items)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add(name, time.perf_counter() - t0)
+                return
+            self.add(name, time.perf_counter() - t0, records=1)
+            yield item
+
+    def add_pipeline(self, stats, prefix: str = "") -> None:
+        """Stages from an ingestion.pipeline.PipelineStats (read / embed / upsert overlap in time)."""
+        self.add(prefix + "read", stats.read_s, stats.records)
+        self.add(prefix + "embed", stats.embed_s, stats.records - stats.reused, batch_size=stats.batch_size)
+        self.add(prefix + "upsert", stats.upsert_s, stats.records, batches=stats.batches,
+                 batch_size=stats.upsert_batch)
+        if stats.reused:
+            self.add(prefix + "embed_store_hits", 0.0, stats.reused)
+
+    def add_sharded(self, stats, prefix: str = "") -> None:
+        """Stages from an ingestion.sharded.ShardedStats (worker time is wall time waiting on the pool)."""
+        self.add(prefix + "embed", stats.embed_s, stats.embedded - stats.reused, batch_size=stats.batch_size)
+        self.add(prefix + "upsert", stats.upsert_s, stats.embedded, batches=stats.batches,
+                 batch_size=stats.upsert_batch)
+        if stats.reused:
+            self.add(prefix + "embed_store_hits", 0.0, stats.reused)
+        self.meta.setdefault("workers", stats.workers)
+        self.meta.setdefault("shards", stats.shards)
+
+    def to_dict(self, status: str) -> Dict[str, Any]:
+        stages = {}
+        for name, st in self.stages.items():
+            secs = st["wall_s"]
+            stages[name] = dict(st, wall_s=round(secs, 4),
+                                records_per_s=round(st["records"] / secs, 1) if secs > 0 else None)
+        return {
+            "entry": self.entry,
+            "status": status,
+            "started_at": self.started.isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - self._t0, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "pid": os.getpid(),
+            "meta": self.meta,
+            "stages": stages,
+        }
+
+    def write(self, status: str = "ok") -> Dict[str, Any]:
+        report = self.to_dict(status)
+        stages = ", ".join(f"{k}={v['wall_s']:.2f}s" for k, v in report["stages"].items())
+        print(f"[report] {self.entry} {status} in {report['wall_s']:.2f}s "
+              f"(peak RSS {report['peak_rss_mb']['self']} MB): {stages}")
+        if REPORT_DIR:
+            out = Path(REPORT_DIR)
+            out.mkdir(parents=True, exist_ok=True)
+            self.path = out / f"{self.entry}-{self.started.strftime('%Y%m%dT%H%M%SZ')}.json"
+            self.path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        return report
+
+    def __enter__(self) -> "RunReport":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.write("ok" if exc_type is None else f"failed: {exc_type.__name__}: {exc}")
+        return False
@@ -0,0 +1,177 @@
+# ingestion/sharded.py
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from ingestion.embed_store import open_embed_store, text_key
+from ingestion.manifest import content_hash
+from ingestion.readers import iter_jsonl_range
+
+SHARD_BYTES = int(os.getenv("SHARD_BYTES", str(4 * 1024 * 1024)))  # input bytes per task
+
+# record_fn(rec) -> (point_id, text_to_embed, payload); must be a module-level function
+RecordFn = Callable[[Dict[str, Any]], Tuple[str, str, Dict[str, Any]]]
+
+
+def shard_offsets(path: Path, shard_bytes: int = SHARD_BYTES) -> List[Tuple[int, int]]:
+    """Split a JSONL file into [start, end) byte ranges that begin and end on line boundaries."""
+    size = path.stat().st_size
+    bounds = [0]
+    with path.open("rb") as f:
+        pos = shard_bytes
+        while pos < size:
+            f.seek(pos)
+            f.readline()              # finish the line we landed in
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+            pos += shard_bytes
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+# ---- worker side (one fastembed instance per process) ----
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(model: str, batch_size: int, record_fn: RecordFn, required: Tuple[str, ...],
+                 use_store: bool = True):
+    from fastembed import TextEmbedding
+    # one ONNX thread per process: scaling comes from processes, not oversubscribed threads
+    _worker["embedder"] = TextEmbedding(model_name=model, threads=1)
+    _worker.update(model=model, batch_size=batch_size, record_fn=record_fn, required=required)
+    # read-only view of the embed store; only the main process appends to it
+    _worker["store"] = open_embed_store(model, readonly=True) if use_store else None
+
+
+def _embed_shard(path: str, start: int, end: int, previous: Dict[str, str]):
+    """
+    `previous` holds the last run's hashes for this shard's rows only.
+    -> (ids, vectors, payloads, hashes of every row seen, {text key: row} of freshly
+    embedded rows, how many rows got their vector from the embed store)
+    """
+    record_fn, model = _worker["record_fn"], _worker["model"]
+    store = _worker["store"]
+    ids, vecs, texts, payloads, seen = [], [], [], [], {}
+    for rec in iter_jsonl_range(Path(path), start, end, required=_worker["required"]):
+        pid, text, payload = record_fn(rec)
+        h = content_hash(text, payload, model)
+        seen[pid] = h
+        if previous.get(pid) == h:
+            continue  # unchanged since the last run
+        ids.append(pid)
+        payloads.append(payload)
+        texts.append(text)
+        vecs.append(store.get_many([text_key(text)])[0] if store is not None else None)
+    todo = [i for i, v in enumerate(vecs) if v is None]
+    fresh = {}
+    embedded = _worker["embedder"].embed([texts[i] for i in todo], batch_size=_worker["batch_size"])
+    for i, vec in zip(todo, embedded):
+        vecs[i] = vec
+        fresh[text_key(texts[i])] = i
+    # counted per row: duplicate texts in one shard collapse to one key in `fresh`
+    return ids, [v.tolist() for v in vecs], payloads, seen, fresh, len(ids) - len(todo)
+
+
+def _previous_slice(path: Path, start: int, end: int, record_fn: RecordFn, previous: Dict[str, str],
+                    required: Tuple[str, ...]) -> Dict[str, str]:
+    """The manifest entries of one shard's rows, so a task never carries the whole manifest."""
+    if not previous:
+        return {}
+    out = {}
+    for rec in iter_jsonl_range(path, start, end, required=required):
+        pid = record_fn(rec)[0]
+        if pid in previous:
+            out[pid] = previous[pid]
+    return out
+
+
+@dataclass
+class ShardedStats:
+    workers: int
+    shards: int = 0
+    records: int = 0          # rows read
+    embedded: int = 0         # rows upserted
+    reused: int = 0           # of which the vector came from the embed store
+    elapsed_s: float = 0.0
+    embed_s: float = 0.0      # waiting on the pool (workers read, hash and embed in parallel)
+    upsert_s: float = 0.0     # upserts and embed-store writes in this process
+    batches: int = 0
+    batch_size: int = 0
+    upsert_batch: int = 0
+    seen: Dict[str, str] = field(default_factory=dict, repr=False)  # point_id -> hash
+
+    @property
+    def records_per_s(self) -> float:
+        return self.embedded / self.elapsed_s if self.elapsed_s else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.embedded}/{self.records} records upserted ({self.reused} reused) by {self.workers} workers "
+                f"over {self.shards} shards in {self.elapsed_s:.2f}s ({self.records_per_s:.1f} rec/s)")
+
+
+def run_sharded(path: Path, record_fn: RecordFn, client: QdrantClient, collection: str,
+                model: str, workers: int = 0, batch_size: int = 256, upsert_batch: int = 512,
+                previous: Optional[Dict[str, str]] = None, required: Tuple[str, ...] = (),
+                shard_bytes: int = SHARD_BYTES, use_store: bool = True) -> ShardedStats:
+    """
+    Embed a JSONL file on a process pool (byte-range shards, one fastembed per worker)
+    and upsert from this process only (single writer). `previous` is the manifest of
+    the last run: unchanged rows are skipped inside the workers, each shard is sent
+    only its own slice of it (this process reads the shard's ids to cut it). use_store=False
+    neither reads nor fills the embed store (benchmarks, throwaway corpora).
+    """
+    if path.suffix.lower() != ".jsonl":
+        raise ValueError(f"sharded ingestion needs a JSONL file (line-aligned byte ranges), got {path}")
+    workers = workers or os.cpu_count() or 1
+    previous = previous or {}
+    required = tuple(required)
+    shards = shard_offsets(path, shard_bytes)
+    stats = ShardedStats(workers=workers, shards=len(shards), batch_size=batch_size, upsert_batch=upsert_batch)
+    store = open_embed_store(model) if use_store else None
+    t0 = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model, batch_size, record_fn, required, use_store)) as pool:
+        todo = iter(shards)
+        inflight = set()
+        while True:
+            # bounded submission keeps at most 2 shards per worker in memory
+            while len(inflight) < 2 * workers:
+                nxt = next(todo, None)
+                if nxt is None:
+                    break
+                inflight.add(pool.submit(_embed_shard, str(path), *nxt,
+                                         _previous_slice(path, *nxt, record_fn, previous, required)))
+            if not inflight:
+                break
+            t = time.perf_counter()
+            finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+            stats.embed_s += time.perf_counter() - t
+            for fut in finished:
+                ids, vecs, payloads, seen, fresh, reused = fut.result()
+                t = time.perf_counter()
+                stats.records += len(seen)
+                stats.seen.update(seen)
+                for i in range(0, len(ids), upsert_batch):
+                    client.upsert(collection_name=collection, points=[
+                        PointStruct(id=pid, vector=vec, payload=payload)
+                        for pid, vec, payload in zip(ids[i:i + upsert_batch], vecs[i:i + upsert_batch],
+                                                     payloads[i:i + upsert_batch])
+                    ])
+                    stats.batches += 1
+                stats.embedded += len(ids)
+                stats.reused += reused
+                if store is not None and fresh:
+                    store.put_many(list(fresh), [vecs[i] for i in fresh.values()])
+                stats.upsert_s += time.perf_counter() - t
+
+    stats.elapsed_s = time.perf_counter() - t0
+    return stats
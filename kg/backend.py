@@ -0,0 +1,222 @@
+# kg/backend.py
+import math
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.kb_versions import versions_of
+from ingestion.readers import iter_records
+from kg.cache import KG_VERSION_NAME
+from kg.config import KG_BACKEND
+from kg.search import normalize_terms
+
+# KG lookups behind one interface, picked by KG_BACKEND:
+#   neo4j     the Neo4j server (fulltext index, pooled driver)            [default]
+#   embedded  an in-process graph loaded from the FAQ JSONL files: inverted keyword
+#             index + Brand/Topic/Category adjacency, no server and no network hop
+# Both expose search(query, limit) -> [{labels, id, question, answer, score}],
+# neighbors(label, name, limit) -> FAQs linked to a Brand/Topic/Category, warmup(), close().
+POLICY_FILE = Path("data/policy_faqs.jsonl")
+PRODUCT_FILE = Path("data/product_faqs.jsonl")
+REL_LABELS = {"Brand": "brand", "Topic": "section", "Category": "category"}
+
+
+def extract_props(ans: str) -> Dict:
+    """Structured facts pulled from an answer (refund window, substitutions); stored on FAQ nodes."""
+    props = {}
+    m = re.search(r'(\d+)\s*[–-]\s*(\d+)\s*(?:working\s*)?days', ans, flags=re.I)
+    if m:
+        props["refund_days_min"] = int(m.group(1))
+        props["refund_days_max"] = int(m.group(2))
+    if re.search(r'\bsubstitut(e|ion)\b', ans, flags=re.I):
+        props["allows_substitution"] = True
+    return props
+
+
+class Neo4jBackend:
+    """The Neo4j server via the shared pooled driver (kg/connection.py)."""
+
+    NEIGHBORS_CQL = """
+    MATCH (f:FAQ)-[:OF_BRAND|IN_TOPIC|IN_CATEGORY]->(x {name: $name})
+    WHERE $label IN labels(x)
+    RETURN labels(f) AS labels, f.id AS id, f.question AS question, f.answer AS answer, 1.0 AS score
+    LIMIT $lim
+    """
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        from kg.search import search
+        return search(query, limit=limit)
+
+    def neighbors(self, label: str, name: str, limit: int = 10) -> List[Dict]:
+        from kg.connection import session
+        with session() as s:
+            return [r.data() for r in s.run(self.NEIGHBORS_CQL, label=label, name=name, lim=limit)]
+
+    def warmup(self) -> None:
+        from kg.connection import warmup
+        warmup()
+
+    def close(self) -> None:
+        from kg.connection import close
+        close()
+
+
+def _stem(term: str) -> str:
+    """Plural folding so 'refunds' finds 'refund' (Neo4j's English analyzer stems fully)."""
+    if term.endswith("'s"):
+        term = term[:-2]
+    if len(term) > 4 and term.endswith("ies"):
+        return term[:-3] + "y"
+    if len(term) > 3 and term.endswith("s") and not term.endswith(("ss", "us", "is")):
+        return term[:-1]
+    return term
+
+
+class _FAQIndex:
+    """One loaded snapshot of the FAQ files; never mutated once built."""
+
+    K1, B = 1.2, 0.75
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict] = {}                                # id -> node
+        self.terms: Dict[str, Counter] = {}                             # id -> term counts
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)    # term -> {id: tf}
+        self.lengths: Dict[str, int] = {}
+        self.adjacency: Dict[str, Dict[str, Set[str]]] = {label: defaultdict(set) for label in REL_LABELS}
+        self.avg_len = 0.0
+
+    def build(self, files: Dict[str, Path]) -> "_FAQIndex":
+        for domain, path in files.items():
+            if not path.exists():
+                print(f"[WARN] kg/backend.py: {path} not found; embedded KG has no {domain} FAQs",
+                      file=sys.stderr)
+                continue
+            for rec in iter_records(path, required=("id", "question", "answer")):
+                self._add(rec, domain)
+        self.avg_len = sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0.0
+        return self
+
+    def _remove(self, i: str) -> None:
+        node = self.nodes.pop(i)
+        for term in self.terms.pop(i):
+            del self.postings[term][i]
+            if not self.postings[term]:
+                del self.postings[term]
+        del self.lengths[i]
+        for label, key in REL_LABELS.items():
+            if node.get(key):
+                self.adjacency[label][node[key]].discard(i)
+
+    def _add(self, rec: Dict, domain: str) -> None:
+        i = rec["id"]
+        if i in self.nodes:
+            self._remove(i)
+        self.nodes[i] = {
+            "labels": ["FAQ", "Policy" if domain == "policy" else "Product"],
+            "id": rec["id"],
+            "question": rec["question"],
+            "answer": rec["answer"],
+            "domain": domain,
+            **{key: rec.get(key) for key in REL_LABELS.values()},
+            **extract_props(rec["answer"]),
+        }
+        terms = [_stem(t) for t in normalize_terms(f"{rec['question']} {rec['answer']}")]
+        self.terms[i] = Counter(terms)
+        for term, tf in self.terms[i].items():
+            self.postings[term][i] = tf
+        self.lengths[i] = len(terms)
+        for label, key in REL_LABELS.items():
+            if rec.get(key):
+                self.adjacency[label][rec[key]].add(i)
+
+    def _row(self, i: str, score: float) -> Dict:
+        n = self.nodes[i]
+        return {"labels": n["labels"], "id": n["id"], "question": n["question"], "answer": n["answer"],
+                "score": score}
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        n_docs = len(self.nodes)
+        scores: Dict[str, float] = defaultdict(float)
+        for term in {_stem(t) for t in normalize_terms(query)}:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for i, tf in posting.items():
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[i] / self.avg_len)
+                scores[i] += idf * tf * (self.K1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [self._row(i, s) for i, s in best]
+
+    def neighbors(self, label: str, name: str, limit: int = 10) -> List[Dict]:
+        return [self._row(i, 1.0) for i in sorted(self.adjacency.get(label, {}).get(name, ()))[:limit]]
+
+
+class EmbeddedBackend:
+    """
+    In-memory FAQ graph built from the same JSONL files the KG ingest scripts load.
+    Search is BM25 over an inverted index of question + answer terms (stop-words
+    removed as in kg/search.py), so lookups cost microseconds and need no server.
+    Nodes are keyed by FAQ id: a repeated id replaces the earlier record, like the
+    MERGE in the ingest scripts. The index is rebuilt on the next lookup after a KG
+    ingest bumps the `kg` version or either file changes; lookups in flight keep
+    the old snapshot, so it is safe to share between threads.
+    """
+
+    def __init__(self, policy_file: Path = POLICY_FILE, product_file: Path = PRODUCT_FILE):
+        self.files = {"policy": policy_file, "product": product_file}
+        self.index: Optional[_FAQIndex] = None
+        self.reloads = 0
+        self._signature: Optional[Tuple] = None
+        self._lock = threading.Lock()
+
+    def _current_signature(self) -> Tuple:
+        mtimes = tuple(p.stat().st_mtime if p.exists() else None for p in self.files.values())
+        return versions_of([KG_VERSION_NAME]), mtimes
+
+    def load(self) -> _FAQIndex:
+        signature = self._current_signature()
+        if signature == self._signature:
+            return self.index
+        with self._lock:
+            if signature != self._signature:
+                if self.index is not None:
+                    self.reloads += 1
+                self.index = _FAQIndex().build(self.files)
+                self._signature = signature
+        return self.index
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        return self.load().search(query, limit)
+
+    def neighbors(self, label: str, name: str, limit: int = 10) -> List[Dict]:
+        return self.load().neighbors(label, name, limit)
+
+    def warmup(self) -> None:
+        self.load()
+
+    def close(self) -> None:
+        pass
+
+
+BACKENDS = {"neo4j": Neo4jBackend, "embedded": EmbeddedBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_kg_backend(name: Optional[str] = None):
+    """Process-wide KG backend (KG_BACKEND unless `name` is given for a one-off instance)."""
+    global _backend
+    if name is not None:
+        return BACKENDS[name]()
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if KG_BACKEND not in BACKENDS:
+                    raise ValueError(f"unknown KG_BACKEND {KG_BACKEND!r} (use {' or '.join(BACKENDS)})")
+                _backend = BACKENDS[KG_BACKEND]()
+    return _backend
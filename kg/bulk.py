@@ -0,0 +1,85 @@
+# kg/bulk.py
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from kg.connection import session
+
+# Bulk KG writes: rows go to the server as one parameter list per explicit transaction
+# (`UNWIND $rows AS r ...`) instead of one auto-commit round trip per record.
+# Transactions run through execute_write, so transient errors (deadlocks between
+# parallel writers MERGE-ing the same Brand/Topic node) are retried by the driver.
+KG_WRITE_BATCH = int(os.getenv("KG_WRITE_BATCH", "1000"))   # rows per transaction
+KG_WRITERS = int(os.getenv("KG_WRITERS", "1"))              # concurrent write transactions
+
+# Unique keys MERGE looks nodes up by; without them every MERGE scans the label
+CONSTRAINTS: Dict[str, str] = {
+    "Policy": "id",
+    "Product": "id",
+    "FAQ": "id",
+    "Brand": "name",
+    "Domain": "name",
+    "Topic": "name",
+    "Category": "name",
+}
+
+
+def ensure_constraints(s, labels: Optional[Iterable[str]] = None) -> None:
+    """Uniqueness constraints (and so indexes) for `labels` (default: all of CONSTRAINTS); run before loading."""
+    for label in labels or CONSTRAINTS:
+        key = CONSTRAINTS[label]
+        s.run(f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.{key} IS UNIQUE").consume()
+
+
+def batched(rows: Iterable, size: int) -> Iterator[List]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _write(cypher: str, batch: List[Dict]) -> int:
+    with session() as s:
+        s.execute_write(lambda tx: tx.run(cypher, rows=batch).consume())
+    return len(batch)
+
+
+def write_rows(cypher: str, rows: Iterable[Dict], batch_size: int = KG_WRITE_BATCH,
+               workers: int = KG_WRITERS, report=None, stage: str = "write") -> int:
+    """
+    Send `rows` to `cypher` (which must start with `UNWIND $rows AS r`) in transactions
+    of `batch_size`. With workers > 1 batches are written concurrently; every row is in
+    exactly one batch, so writers work on disjoint partitions of the input.
+    Returns rows written; the stage's wall time and batch counts go to `report`.
+    """
+    t0 = time.perf_counter()
+    written = batches = 0
+    if workers <= 1:
+        for batch in batched(rows, batch_size):
+            written += _write(cypher, batch)
+            batches += 1
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kg-writer") as pool:
+            todo = batched(rows, batch_size)
+            inflight = set()
+            while True:
+                # bounded submission keeps at most 2 batches per writer in memory
+                while len(inflight) < 2 * workers:
+                    batch = next(todo, None)
+                    if batch is None:
+                        break
+                    inflight.add(pool.submit(_write, cypher, batch))
+                if not inflight:
+                    break
+                finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    written += fut.result()
+                    batches += 1
+    if report is not None:
+        report.add(stage, time.perf_counter() - t0, written, batches, batch_size)
+        report.meta.setdefault("writers", workers)
+    return written
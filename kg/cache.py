@@ -0,0 +1,62 @@
+# kg/cache.py
+import os
+import threading
+from typing import Callable, Dict, Hashable, List, Optional
+
+from app.kb_versions import versions_of
+from app.lru import LRUCache
+from kg.search import normalize_terms
+
+# KG lookups repeat the same few keyword sets ("refund", "delivery", "bakery") while
+# the KG only changes when an ingest script runs. Results are cached by normalized
+# term set + limit; the ingest scripts bump KG_VERSION_NAME in kb_versions.json,
+# which drops every entry on the next lookup. KG_CACHE=0 disables.
+KG_VERSION_NAME = "kg"
+KG_CACHE_SIZE = int(os.getenv("KG_CACHE_SIZE", "2048"))
+KG_CACHE_TTL_S = float(os.getenv("KG_CACHE_TTL_S", "3600"))   # backstop for writes made outside the scripts
+
+
+class KGLookupCache:
+    """Bounded TTL/LRU cache of KG search results, cleared when the KG version changes."""
+
+    def __init__(self, maxsize: int = KG_CACHE_SIZE, ttl: Optional[float] = KG_CACHE_TTL_S,
+                 kb_name: str = KG_VERSION_NAME):
+        self.lru = LRUCache(maxsize, ttl)
+        self.kb_names = (kb_name,)
+        self.invalidations = 0
+        self._versions = versions_of(self.kb_names)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, limit: int) -> Hashable:
+        """'Refund for bakery?' and 'bakery refund' share an entry: same terms, order ignored."""
+        return tuple(sorted(normalize_terms(query))), limit
+
+    def _check_versions(self) -> None:
+        current = versions_of(self.kb_names)
+        if current != self._versions:
+            with self._lock:
+                if current != self._versions:
+                    self._versions = current
+                    self.lru.clear()
+                    self.invalidations += 1
+
+    def search(self, query: str, limit: int, search_fn: Callable[[str, int], List[Dict]]) -> List[Dict]:
+        """Cached search_fn(query, limit); callers get their own copies of the rows."""
+        self._check_versions()
+        k = self.key(query, limit)
+        rows = self.lru.get(k)
+        if rows is None:
+            rows = search_fn(query, limit)
+            self.lru.put(k, rows)
+        return [dict(r) for r in rows]
+
+    def stats(self) -> Dict:
+        return dict(self.lru.stats(), invalidations=self.invalidations)
+
+
+def cache_from_env() -> Optional[KGLookupCache]:
+    """KG_CACHE=0 disables; size/TTL via KG_CACHE_SIZE / KG_CACHE_TTL_S."""
+    if os.getenv("KG_CACHE", "1") != "1":
+        return None
+    return KGLookupCache()
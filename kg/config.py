@@ -1,6 +1,17 @@
 # kg/config.py
 import os
-NEO4J_URI = "bolt://localhost:7687"
-NEO4J_USER = "neo4j"
-NEO4J_PASSWORD = "supermarket123"
 
+# Connection settings (env overrides); the defaults match docker-compose.neo4j.yml
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "testpassword")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or None     # None = server default database
+
+# KG lookups: "neo4j" (server) or "embedded" (in-process, from the FAQ files); see kg/backend.py
+KG_BACKEND = os.getenv("KG_BACKEND", "neo4j")
+
+# Driver pool (see kg/connection.py)
+NEO4J_POOL_SIZE = int(os.getenv("NEO4J_POOL_SIZE", "16"))
+NEO4J_WARMUP_CONNECTIONS = int(os.getenv("NEO4J_WARMUP_CONNECTIONS", "2"))  # opened at startup
+NEO4J_ACQUIRE_TIMEOUT_S = float(os.getenv("NEO4J_ACQUIRE_TIMEOUT_S", "5"))  # wait for a free connection
+NEO4J_CONN_LIFETIME_S = float(os.getenv("NEO4J_CONN_LIFETIME_S", "3600"))   # recycle older connections
@@ -0,0 +1,115 @@
+# kg/connection.py
+import atexit
+import threading
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+from neo4j import AsyncDriver, AsyncGraphDatabase, Driver, GraphDatabase
+
+from kg.config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_DATABASE, NEO4J_POOL_SIZE,
+    NEO4J_WARMUP_CONNECTIONS, NEO4J_ACQUIRE_TIMEOUT_S, NEO4J_CONN_LIFETIME_S,
+)
+
+# One pooled Neo4j driver per process. Drivers are thread-safe and keep Bolt
+# connections open between sessions, so callers borrow a session per unit of work
+# instead of paying a handshake + auth per question. Sessions are not thread-safe:
+# open one per thread/call, never share them.
+
+
+def _driver_kwargs() -> Dict[str, Any]:
+    return {
+        "auth": (NEO4J_USER, NEO4J_PASSWORD),
+        "max_connection_pool_size": NEO4J_POOL_SIZE,
+        "connection_acquisition_timeout": NEO4J_ACQUIRE_TIMEOUT_S,
+        "max_connection_lifetime": NEO4J_CONN_LIFETIME_S,
+        "keep_alive": True,
+    }
+
+
+_driver: Optional[Driver] = None
+_driver_lock = threading.Lock()
+
+
+def get_driver() -> Driver:
+    """Process-wide sync driver (created on first use, closed at exit)."""
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                _driver = GraphDatabase.driver(NEO4J_URI, **_driver_kwargs())
+    return _driver
+
+
+def session(**kwargs):
+    """A session on the shared driver, bound to NEO4J_DATABASE; use as a context manager."""
+    kwargs.setdefault("database", NEO4J_DATABASE)
+    return get_driver().session(**kwargs)
+
+
+def run_query(cypher: str, **params) -> List:
+    """Run one read query in a short-lived session and return all records."""
+    with session() as s:
+        return list(s.run(cypher, **params))
+
+
+def warmup(connections: int = NEO4J_WARMUP_CONNECTIONS) -> Driver:
+    """Verify connectivity and open `connections` pooled connections so early requests skip the handshake."""
+    driver = get_driver()
+    driver.verify_connectivity()
+    with ExitStack() as stack:
+        # sessions held open together each check out their own connection
+        for _ in range(max(connections, 1)):
+            stack.enter_context(session()).run("RETURN 1").consume()
+    return driver
+
+
+def close() -> None:
+    """Close the shared sync driver (and its pool); the next get_driver() opens a new one."""
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+
+
+atexit.register(close)
+
+
+# ---- asyncio variant (bound to the event loop it is first used on) ----
+_async_driver: Optional[AsyncDriver] = None
+
+
+def get_async_driver() -> AsyncDriver:
+    """Process-wide async driver for asyncio callers; call from inside the serving event loop."""
+    global _async_driver
+    if _async_driver is None:
+        _async_driver = AsyncGraphDatabase.driver(NEO4J_URI, **_driver_kwargs())
+    return _async_driver
+
+
+async def arun_query(cypher: str, **params) -> List:
+    async with get_async_driver().session(database=NEO4J_DATABASE) as s:
+        result = await s.run(cypher, **params)
+        return [r async for r in result]
+
+
+async def awarmup(connections: int = NEO4J_WARMUP_CONNECTIONS) -> AsyncDriver:
+    driver = get_async_driver()
+    await driver.verify_connectivity()
+    sessions = [driver.session(database=NEO4J_DATABASE) for _ in range(max(connections, 1))]
+    try:
+        for s in sessions:
+            await (await s.run("RETURN 1")).consume()
+    finally:
+        for s in sessions:
+            await s.close()
+    return driver
+
+
+async def aclose() -> None:
+    """Close the async driver; must run on the loop that used it."""
+    global _async_driver
+    if _async_driver is not None:
+        driver, _async_driver = _async_driver, None
+        await driver.close()
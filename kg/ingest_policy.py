@@ -1,31 +1,46 @@
 # kg/ingest_policy.py
-import json
+import argparse
 from pathlib import Path
-from neo4j import GraphDatabase
-from kg.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from app.kb_versions import bump_version
+from kg.bulk import KG_WRITE_BATCH, KG_WRITERS, ensure_constraints, write_rows
+from kg.cache import KG_VERSION_NAME
+from kg.connection import session as kg_session
+from kg.search import ensure_fulltext_index
+from ingestion.readers import iter_records
+from ingestion.report import RunReport
 
 DATA_PATH = Path("data/policy_faqs.jsonl")
 
-def ingest():
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# one transaction per batch of rows (kg/bulk.py)
+CQL = """
+UNWIND $rows AS r
+MERGE (p:Policy {id: r.id})
+SET p.section = r.section,
+    p.question = r.question,
+    p.answer = r.answer
+"""
 
-    with driver.session() as session:
-        with DATA_PATH.open() as f:
-            for line in f:
-                doc = json.loads(line)
-                session.run(
-                    """
-                    MERGE (p:Policy {id: $id})
-                    SET p.section = $section,
-                        p.question = $question,
-                        p.answer = $answer
-                    """,
-                    id=doc["id"],
-                    section=doc["section"],
-                    question=doc["question"],
-                    answer=doc["answer"],
-                )
-    print("✅ Ingested Policy KB into Neo4j")
+def to_row(doc):
+    return {
+        "id": doc["id"],
+        "section": doc["section"],
+        "question": doc["question"],
+        "answer": doc["answer"],
+    }
+
+def ingest(batch_size: int = KG_WRITE_BATCH, workers: int = KG_WRITERS):
+    with RunReport("kg_ingest_policy", input=str(DATA_PATH)) as report:
+        with report.stage("schema"), kg_session() as session:
+            ensure_constraints(session, ["Policy"])  # MERGE on id becomes an index lookup
+            ensure_fulltext_index(session)  # no-op once it exists
+        docs = report.timed("read", iter_records(DATA_PATH, required=("id", "question", "answer")))
+        n = write_rows(CQL, map(to_row, docs), batch_size, workers, report=report)
+    bump_version(KG_VERSION_NAME)  # drops cached KG lookups and answers built on the old graph
+    print(f"✅ Ingested {n} Policy nodes into Neo4j")
 
 if __name__ == "__main__":
-    ingest()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch-size", type=int, default=KG_WRITE_BATCH, help="rows per write transaction")
+    ap.add_argument("--workers", type=int, default=KG_WRITERS, help="concurrent write transactions")
+    args = ap.parse_args()
+    ingest(args.batch_size, args.workers)
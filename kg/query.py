@@ -1,30 +1,17 @@
 # kg/query.py
 import sys
-from neo4j import GraphDatabase
-from kg.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from kg.backend import get_kg_backend
 
 def run_query(user_query: str):
-    """Very simple KG search: looks for Policy + Product nodes related to query keywords."""
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-
-    with driver.session() as session:
-        result = session.run(
-            """
-            MATCH (n)
-            WHERE any(word IN split(toLower($q), " ") WHERE toLower(n.question) CONTAINS word OR toLower(n.answer) CONTAINS word)
-            RETURN labels(n) AS labels, n.id AS id, n.question AS question, n.answer AS answer
-            LIMIT 10
-            """,
-            q=user_query,
-        )
-        rows = list(result)
+    """Very simple KG search: Policy / Product / FAQ nodes ranked by score on the KG_BACKEND backend."""
+    rows = get_kg_backend().search(user_query, limit=10)
 
     if not rows:
         print("No matches found.")
     else:
         for r in rows:
             labels = ", ".join(r["labels"])
-            print(f"[{labels}] {r['question']}\n→ {r['answer']}\n")
+            print(f"[{labels}] ({r['score']:.2f}) {r['question']}\n→ {r['answer']}\n")
 
 if __name__ == "__main__":
     q = " ".join(sys.argv[1:]) or "refund policy"
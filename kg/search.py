@@ -0,0 +1,73 @@
+# kg/search.py
+import os
+import re
+from typing import Dict, List
+
+# KG keyword search on a Lucene fulltext index over question/answer of every FAQ-like
+# label, instead of `MATCH (n) WHERE ... CONTAINS w` (a scan of every node, lowercasing
+# two properties per node per word). Hits come back ranked by Lucene score.
+KG_INDEX = os.getenv("KG_FULLTEXT_INDEX", "kgText")
+KG_LABELS = ("Policy", "Product", "FAQ")     # kg/ingest_* and scripts/30_ingest_kg_neo4j.py
+KG_ANALYZER = "english"                      # lowercasing, stemming, Lucene's English stop-words
+
+# Dropped before the query reaches Lucene: question filler that would otherwise match
+# most FAQs ("how do I ...", "... for groceries") and drown the content words.
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers him his how i if in into is it its itself just me more
+most my no nor not of off on once only or other our ours out over own same she should so some
+such than that the their them then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+_TERM = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def normalize_terms(query: str) -> List[str]:
+    """Lowercased content words of `query` in first-seen order (stop-words and duplicates removed)."""
+    seen: Dict[str, None] = {}
+    for t in _TERM.findall(query.lower()):
+        if t not in STOP_WORDS and t not in seen:
+            seen[t] = None
+    return list(seen)
+
+
+def lucene_query(terms: List[str]) -> str:
+    """OR of the escaped terms; Lucene ranks nodes matching more (and rarer) terms higher."""
+    return " OR ".join(_LUCENE_SPECIAL.sub(r"\\\1", t) for t in terms)
+
+
+def ensure_fulltext_index(session) -> None:
+    """Create KG_INDEX if missing (Neo4j keeps it in sync with later writes)."""
+    labels = "|".join(KG_LABELS)
+    session.run(
+        f"CREATE FULLTEXT INDEX {KG_INDEX} IF NOT EXISTS "
+        f"FOR (n:{labels}) ON EACH [n.question, n.answer] "
+        f"OPTIONS {{indexConfig: {{`fulltext.analyzer`: '{KG_ANALYZER}'}}}}"
+    ).consume()
+
+
+SEARCH_CQL = """
+CALL db.index.fulltext.queryNodes($index, $q) YIELD node, score
+RETURN labels(node) AS labels, node.id AS id, node.question AS question, node.answer AS answer, score
+ORDER BY score DESC
+LIMIT $lim
+"""
+
+
+def search(query: str, limit: int = 10, session=None) -> List[Dict]:
+    """
+    Top `limit` KG nodes for `query` by fulltext score:
+    [{labels, id, question, answer, score}]. A query of only stop-words returns [].
+    """
+    terms = normalize_terms(query)
+    if not terms:
+        return []
+    params = {"index": KG_INDEX, "q": lucene_query(terms), "lim": limit}
+    if session is not None:
+        return [r.data() for r in session.run(SEARCH_CQL, **params)]
+    from kg.connection import session as kg_session  # here so the term helpers work without neo4j installed
+    with kg_session() as s:
+        return [r.data() for r in s.run(SEARCH_CQL, **params)]
@@ -1,44 +1,53 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
-from fastembed import TextEmbedding
+import sys
+import time
+from pathlib import Path
+
+from app.rag_mistral import get_retriever, build_filter
+from ingestion.readers import iter_jsonl
+
+BATCH = 64  # queries per embed pass / Qdrant batch search
+
+
+def load_queries(path: Path):
+    """Replay file: JSONL with a 'query' (or 'question' / 'title') field per line."""
+    out = []
+    for rec in iter_jsonl(path):
+        q = rec.get("query") or rec.get("question") or rec.get("title")
+        if q:
+            out.append(q)
+    return out
+
 
 def main():
-    client = QdrantClient(path="db.qdrant")
+    retriever = get_retriever(warmup=True)
     collection = "kb_policy_policy_chunks"
     print("Using collection:", collection)
 
-    # Same model family as ingestion
-    embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-    query_text = "What to do if the customer is not at home during delivery?"
-    vec = list(embedder.embed([query_text]))[0]
-
-    flt = Filter(must=[FieldCondition(key="domain", match=MatchValue(value="policy"))])
-
-    hits = client.search(
-        collection_name=collection,
-        query_vector=vec,
-        limit=3,
-        query_filter=flt,
-        with_payload=True,
-    )
-
-    hits = client.search(
-    collection_name=collection,
-    query_vector=vec,
-    limit=3,
-    query_filter=flt,
-    with_payload=True,
-)
-
-    print("\nRaw hits:", hits)   # DEBUG
-
-    print("\nTop matches:")
-    for h in hits:
-        payload = h.payload or {}
-        title = payload.get("policy_title")
-        snippet = (payload.get("text") or "")[:220].replace("\n", " ")
-        print(f"- score={h.score:.3f} | title={title}")
-        print("  ", snippet, "...\n")
+    # Optional: bulk replay, e.g. python retriever_test.py requests.jsonl
+    if len(sys.argv) > 1:
+        queries = load_queries(Path(sys.argv[1]))
+    else:
+        queries = ["What to do if the customer is not at home during delivery?"]
+
+    flt = build_filter({"domain": "policy"})
+
+    t0 = time.perf_counter()
+    results = []
+    for i in range(0, len(queries), BATCH):
+        results += retriever.search_many(queries[i:i + BATCH], k=3, collection=collection, query_filter=flt)
+    dt = time.perf_counter() - t0
+
+    for query_text, hits in zip(queries, results):
+        print(f"\nQuery: {query_text}")
+        print("Top matches:")
+        for h in hits:
+            payload = h.payload or {}
+            title = payload.get("policy_title")
+            snippet = (payload.get("text") or "")[:220].replace("\n", " ")
+            print(f"- score={h.score:.3f} | title={title}")
+            print("  ", snippet, "...\n")
+
+    print(f"{len(queries)} queries in {dt:.2f}s ({len(queries) / max(dt, 1e-9):.1f} q/s)")
 
 if __name__ == "__main__":
     main()
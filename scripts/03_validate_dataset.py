@@ -1,15 +1,18 @@
-import json
 from pathlib import Path
 
-faqs = Path("data/faqs.jsonl").read_text(encoding="utf-8").splitlines()
-print("FAQ records:", len(faqs))
+from ingestion.readers import iter_jsonl
+
+faqs = sum(1 for _ in iter_jsonl(Path("data/faqs.jsonl")))
+print("FAQ records:", faqs)
 
 pol_path = Path("data/policies.jsonl")
 if pol_path.exists():
-    pols = pol_path.read_text(encoding="utf-8").splitlines()
-    print("Policy records:", len(pols))
-    if pols:
-        ex = json.loads(pols[0])
+    ex, pols = None, 0
+    for rec in iter_jsonl(pol_path):
+        ex = ex or rec
+        pols += 1
+    print("Policy records:", pols)
+    if ex:
         print("\nSample policy title:", ex.get("policy_title"))
         print(ex.get("policy_text", "")[:600], "...")
 else:
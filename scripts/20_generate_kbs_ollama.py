@@ -5,7 +5,8 @@ import time
 import re
 from pathlib import Path
 from typing import List, Dict, Any
-import requests
+
+from app.ollama_client import OllamaClient
 
 # ---------- CONFIG ----------
 OLLAMA_URL = "http://127.0.0.1:11434"
@@ -29,30 +30,29 @@ PRODUCT_CATEGORIES = ["Bakery", "Dairy", "Fresh Produce", "Household", "Beverage
 BATCH_ITEMS = 2         # generate 2 QAs per request (faster/safer on CPU)
 TARGET_PER_GROUP = 20   # 5 groups * 20 = 100 per KB
 
+# One pooled client for the whole run; it keeps the model loaded between batches
+# and retries connection errors / timeouts with jittered backoff.
+client = OllamaClient(base_url=OLLAMA_URL, max_retries=MAX_RETRIES, timeout=REQ_TIMEOUT)
+
 
 def call_ollama(prompt: str, model: str = GEN_MODEL, timeout: int = REQ_TIMEOUT) -> str:
-    """Call Ollama /api/generate and return raw response text."""
+    """
+    Call Ollama /api/generate and return raw response text. Transport errors are
+    retried by the client (and raise once it gives up); this loop only re-asks
+    when the model answers with an empty response.
+    """
     for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            r = requests.post(
-                f"{OLLAMA_URL}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "temperature": TEMPERATURE,
-                    "options": {"num_predict": 128}  # keep outputs short and snappy
-                },
-                timeout=timeout,
-            )
-            r.raise_for_status()
-            resp = r.json().get("response", "")
-            if resp and resp.strip():
-                return resp
-        except requests.exceptions.ReadTimeout:
-            pass
+        resp = client.generate(
+            prompt,
+            model=model,
+            temperature=TEMPERATURE,
+            options={"num_predict": 128},  # keep outputs short and snappy
+            timeout=timeout,
+        )
+        if resp and resp.strip():
+            return resp
         time.sleep(0.6 * attempt)
-    raise RuntimeError(f"Ollama returned empty/timeout after {MAX_RETRIES} attempts")
+    raise RuntimeError(f"Ollama returned an empty response {MAX_RETRIES} times")
 
 
 def extract_json_block(text: str) -> str:
@@ -1,74 +1,67 @@
-import json, re
+import argparse
 from pathlib import Path
-from neo4j import GraphDatabase
 
-NEO4J_URI  = "bolt://localhost:7687"
-NEO4J_USER = "neo4j"
-NEO4J_PASS = "testpassword"
+from app.kb_versions import bump_version
+from ingestion.readers import iter_records
+from ingestion.report import RunReport
+from kg.backend import extract_props
+from kg.bulk import KG_WRITE_BATCH, KG_WRITERS, ensure_constraints, write_rows
+from kg.cache import KG_VERSION_NAME
+from kg.connection import session
+from kg.search import ensure_fulltext_index
 
 POLICY_FILE  = Path("data/policy_faqs.jsonl")
 PRODUCT_FILE = Path("data/product_faqs.jsonl")
 
-def extract_props(ans: str):
-    props = {}
-    m = re.search(r'(\d+)\s*[–-]\s*(\d+)\s*(?:working\s*)?days', ans, flags=re.I)
-    if m:
-      props["refund_days_min"] = int(m.group(1))
-      props["refund_days_max"] = int(m.group(2))
-    if re.search(r'\bsubstitut(e|ion)\b', ans, flags=re.I):
-      props["allows_substitution"] = True
-    return props
+POLICY_CQL = """
+UNWIND $rows AS r
+MERGE (b:Brand {name: r.brand})
+MERGE (t:Topic {name: r.topic})
+MERGE (f:FAQ {id: r.id})
+SET f.question = r.q, f.answer = r.a, f.domain = 'policy', f.brand = r.brand
+MERGE (f)-[:OF_BRAND]->(b)
+MERGE (f)-[:IN_TOPIC]->(t)
+SET f += r.props
+"""
 
-def run():
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
-    with driver.session() as s:
-        # constraints + fulltext index
-        s.run("CREATE CONSTRAINT IF NOT EXISTS FOR (f:FAQ) REQUIRE f.id IS UNIQUE;")
-        s.run("CREATE CONSTRAINT IF NOT EXISTS FOR (b:Brand) REQUIRE b.name IS UNIQUE;")
-        s.run("CREATE CONSTRAINT IF NOT EXISTS FOR (t:Topic) REQUIRE t.name IS UNIQUE;")
-        s.run("CREATE CONSTRAINT IF NOT EXISTS FOR (c:Category) REQUIRE c.name IS UNIQUE;")
-        s.run("""
-        CREATE FULLTEXT INDEX faqText IF NOT EXISTS
-        FOR (f:FAQ) ON EACH [f.question, f.answer];
-        """)
+PRODUCT_CQL = """
+UNWIND $rows AS r
+MERGE (b:Brand {name: r.brand})
+MERGE (c:Category {name: r.cat})
+MERGE (f:FAQ {id: r.id})
+SET f.question = r.q, f.answer = r.a, f.domain = 'product', f.brand = r.brand
+MERGE (f)-[:OF_BRAND]->(b)
+MERGE (f)-[:IN_CATEGORY]->(c)
+SET f += r.props
+"""
 
-        # ingest policy
-        count = 0
-        for line in POLICY_FILE.read_text(encoding="utf-8").splitlines():
-            r = json.loads(line)
-            props = extract_props(r["answer"])
-            s.run("""
-            MERGE (b:Brand {name: $brand})
-            MERGE (t:Topic {name: $topic})
-            MERGE (f:FAQ {id: $id})
-              ON CREATE SET f.question=$q, f.answer=$a, f.domain='policy', f.brand=$brand
-              ON MATCH  SET f.question=$q, f.answer=$a, f.domain='policy', f.brand=$brand
-            MERGE (f)-[:OF_BRAND]->(b)
-            MERGE (f)-[:IN_TOPIC]->(t)
-            SET f += $props
-            """, brand=r["brand"], topic=r["section"], id=r["id"], q=r["question"], a=r["answer"], props=props)
-            count += 1
+def run(batch_size: int = KG_WRITE_BATCH, workers: int = KG_WRITERS):
+    with RunReport("30_ingest_kg_neo4j", policy=str(POLICY_FILE), product=str(PRODUCT_FILE)) as report:
+        # constraints before any MERGE (index lookups, not label scans) + fulltext index
+        with report.stage("schema"), session() as s:
+            ensure_constraints(s, ["FAQ", "Brand", "Topic", "Category"])
+            ensure_fulltext_index(s)  # kgText over FAQ/Policy/Product, queried by kg/search.py
+
+        # ingest policy: one UNWIND transaction per batch (kg/bulk.py)
+        rows = ({"brand": r["brand"], "topic": r["section"], "id": r["id"], "q": r["question"],
+                 "a": r["answer"], "props": extract_props(r["answer"])}
+                for r in report.timed("read_policy", iter_records(
+                    POLICY_FILE, required=("id", "brand", "section", "question", "answer"))))
+        count = write_rows(POLICY_CQL, rows, batch_size, workers, report=report, stage="write_policy")
         print(f"Ingested policy FAQs: {count}")
 
         # ingest product
-        count = 0
-        for line in PRODUCT_FILE.read_text(encoding="utf-8").splitlines():
-            r = json.loads(line)
-            props = extract_props(r["answer"])
-            s.run("""
-            MERGE (b:Brand {name: $brand})
-            MERGE (c:Category {name: $cat})
-            MERGE (f:FAQ {id: $id})
-              ON CREATE SET f.question=$q, f.answer=$a, f.domain='product', f.brand=$brand
-              ON MATCH  SET f.question=$q, f.answer=$a, f.domain='product', f.brand=$brand
-            MERGE (f)-[:OF_BRAND]->(b)
-            MERGE (f)-[:IN_CATEGORY]->(c)
-            SET f += $props
-            """, brand=r["brand"], cat=r["category"], id=r["id"], q=r["question"], a=r["answer"], props=props)
-            count += 1
+        rows = ({"brand": r["brand"], "cat": r["category"], "id": r["id"], "q": r["question"],
+                 "a": r["answer"], "props": extract_props(r["answer"])}
+                for r in report.timed("read_product", iter_records(
+                    PRODUCT_FILE, required=("id", "brand", "category", "question", "answer"))))
+        count = write_rows(PRODUCT_CQL, rows, batch_size, workers, report=report, stage="write_product")
         print(f"Ingested product FAQs: {count}")
-
-    driver.close()
+    bump_version(KG_VERSION_NAME)  # drops cached KG lookups and answers built on the old graph
 
 if __name__ == "__main__":
-    run()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch-size", type=int, default=KG_WRITE_BATCH, help="rows per write transaction")
+    ap.add_argument("--workers", type=int, default=KG_WRITERS, help="concurrent write transactions")
+    args = ap.parse_args()
+    run(args.batch_size, args.workers)
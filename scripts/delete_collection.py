@@ -1,5 +1,28 @@
-from qdrant_client import QdrantClient
+# scripts/delete_collection.py
+"""
+Drop a KB collection without taking retrieval offline.
 
-client = QdrantClient(path="db.qdrant")
-client.delete_collection("kb_policy_policy_chunks")
-print("Deleted collection: kb_policy_policy_chunks")
+  python -m scripts.delete_collection kb_policy_policy_chunks        # alias: drop old versions only
+  python -m scripts.delete_collection kb_policy_policy_chunks_v3     # a specific, non-live version
+
+The live version behind an alias is never deleted here; rebuild with
+`--rebuild` (blue/green, see ingestion/aliases.py) to replace it.
+"""
+import sys
+
+from app.vector_storage import connect
+from ingestion.aliases import aliases, gc_versions
+
+name = sys.argv[1] if len(sys.argv) > 1 else "kb_policy_policy_chunks"
+client = connect("db.qdrant")
+live = aliases(client)
+
+if name in live:
+    dropped = gc_versions(client, name, keep=1)
+    print(f"'{name}' is an alias for {live[name]}; dropped {len(dropped)} old version(s)")
+elif name in live.values():
+    alias = next(a for a, c in live.items() if c == name)
+    sys.exit(f"Refusing to delete {name}: it is live behind alias '{alias}'")
+else:
+    client.delete_collection(name)
+    print(f"Deleted collection: {name}")
@@ -0,0 +1,54 @@
+# tests/test_ollama_client.py
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.ollama_client import OllamaClient  # noqa: E402
+
+
+class FakeStreamResponse:
+    """Enough of requests.Response for OllamaClient.stream: NDJSON lines, usable in `with`."""
+
+    def __init__(self, chunks):
+        self.lines = [json.dumps(c).encode() for c in chunks]
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def client_streaming(monkeypatch, chunks):
+    client = OllamaClient(max_retries=1)
+    monkeypatch.setattr(client, "_post", lambda payload, stream, timeout: FakeStreamResponse(chunks))
+    return client
+
+
+def test_stream_yields_tokens_until_done(monkeypatch):
+    client = client_streaming(monkeypatch, [
+        {"response": "Hel"}, {"response": "lo"}, {"response": "", "done": True, "eval_count": 2},
+    ])
+    metrics = {}
+    assert "".join(client.stream("hi", model="m", metrics=metrics)) == "Hello"
+    assert metrics["tokens"] == 2
+
+
+def test_stream_raises_on_error_line(monkeypatch):
+    client = client_streaming(monkeypatch, [{"response": "Partial"}, {"error": "model unloaded"}])
+    tokens = []
+    with pytest.raises(RuntimeError, match="model unloaded"):
+        for token in client.stream("hi", model="m"):
+            tokens.append(token)
+    assert tokens == ["Partial"]
+
+
+def test_stream_raises_when_cut_off_before_done(monkeypatch):
+    client = client_streaming(monkeypatch, [{"response": "Partial"}])
+    with pytest.raises(RuntimeError, match="before the done line"):
+        list(client.stream("hi", model="m"))
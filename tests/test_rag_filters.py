@@ -0,0 +1,71 @@
+# tests/test_rag_filters.py
+import asyncio
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("qdrant_client")
+pytest.importorskip("fastembed")
+
+from qdrant_client.models import PointStruct  # noqa: E402
+
+import app.rag_mistral as rag  # noqa: E402
+from app.server import AnswerService, Backends  # noqa: E402
+from app.vector_storage import create_collection  # noqa: E402
+
+DIM = 8
+
+
+class FixedEmbedder:
+    """Stands in for the ONNX model: every text maps to the same unit vector."""
+
+    def __init__(self, model_name=None):
+        pass
+
+    def embed(self, texts, batch_size=None):
+        for _ in texts:
+            yield np.ones(DIM, dtype=np.float32)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "TextEmbedding", FixedEmbedder)
+    monkeypatch.setattr(rag, "answer_with_ollama", lambda prompt, **kw: "ok")
+    retriever = rag.Retriever(path=str(tmp_path / "qdrant"), collection=rag.COLLECTION)
+    create_collection(retriever.client, rag.COLLECTION, "float32", size=DIM)
+    retriever.client.upsert(rag.COLLECTION, points=[
+        PointStruct(id=i, vector=[1.0] * DIM, payload={
+            "domain": "policy", "brand": brand, "policy_title": f"{brand} delivery",
+            "text": f"{brand} delivers daily.", "source_url": None,
+        })
+        for i, brand in enumerate(["Tesco", "Aldi", "Tesco"])
+    ])
+    monkeypatch.setattr(rag, "_retriever", retriever)
+    backends = Backends(agent_fn=lambda q: {}, rag_fn=rag.rag_answer,
+                        rag_filter_fields=rag.FILTER_FIELDS[rag.COLLECTION])
+    yield AnswerService(backends)
+    retriever.close()
+
+
+def post_rag(service, body):
+    async def go():
+        await service.start("127.0.0.1", 0)
+        try:
+            return await service.route("POST", "/rag", json.dumps(body).encode())
+        finally:
+            await service.shutdown(grace_s=1)
+    return asyncio.run(go())
+
+
+def test_filtered_rag_returns_matching_context(service):
+    status, resp = post_rag(service, {"question": "delivery?", "k": 3, "filters": {"brand": "Tesco"}})
+    assert status == 200
+    assert resp["context"]
+    assert {c["title"] for c in resp["context"]} == {"Tesco delivery"}
+
+
+def test_filter_on_field_the_collection_lacks_is_rejected(service):
+    status, resp = post_rag(service, {"question": "delivery?", "filters": {"section": "Delivery"}})
+    assert status == 400
+    assert "section" in resp["error"]
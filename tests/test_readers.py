@@ -0,0 +1,37 @@
+# tests/test_readers.py
+import json
+
+from ingestion.readers import iter_records
+
+FIELDS = ["id", "question", "answer", "brand"]
+
+
+def test_csv_blank_cell_reads_like_missing_jsonl_key(tmp_path):
+    csv_path = tmp_path / "faqs.csv"
+    csv_path.write_text(
+        "id,question,answer,brand\n"
+        "a1,Do you deliver?,Yes.,\n"
+        "a2,Open Sundays?,10-4.,Tesco\n",
+        encoding="utf-8",
+    )
+    jsonl_path = tmp_path / "faqs.jsonl"
+    jsonl_path.write_text(
+        json.dumps({"id": "a1", "question": "Do you deliver?", "answer": "Yes."}) + "\n"
+        + json.dumps({"id": "a2", "question": "Open Sundays?", "answer": "10-4.", "brand": "Tesco"}) + "\n",
+        encoding="utf-8",
+    )
+
+    from_csv = list(iter_records(csv_path, required=("id", "question", "answer")))
+    from_jsonl = list(iter_records(jsonl_path, required=("id", "question", "answer")))
+
+    assert from_csv == from_jsonl
+    assert "brand" not in from_csv[0]
+    assert from_csv[0].get("brand", "SupermarketCo") == "SupermarketCo"
+
+
+def test_csv_blank_required_cell_is_skipped(tmp_path, capsys):
+    csv_path = tmp_path / "faqs.csv"
+    csv_path.write_text("id,question,answer\na1,,Yes.\na2,Q?,A.\n", encoding="utf-8")
+    rows = list(iter_records(csv_path, required=("id", "question", "answer")))
+    assert [r["id"] for r in rows] == ["a2"]
+    assert "missing question" in capsys.readouterr().err